@@ -0,0 +1,277 @@
+"""
+Benchmarks the forest_utils loaders on tiny locally generated models
+
+Every loader is measured in a fresh process: import time, cold load (artifact cached but not yet
+extracted or deserialized), warm load (second load in the same process), single versus batched
+inference throughput and peak RSS. The results are written to a JSON report so that releases can
+be compared, e.g.
+
+    python benchmarks/run.py --output benchmark.json
+    python benchmarks/run.py --cases keras_h5 spacy --items 512
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import zipfile
+import argparse
+import platform
+import importlib
+import subprocess
+import tempfile
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+TEXTS = ['this movie was very good', 'i hate it', 'the movie is not bad', 'i love this very good movie']
+WORDS = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]'] + 'the a good bad movie was is not very i love hate it this'.split()
+
+
+def _zip_dir(directory, archive):
+    with zipfile.ZipFile(archive, 'w') as file:
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = os.path.join(root, name)
+                file.write(path, os.path.relpath(path, os.path.dirname(directory)))
+
+
+def _keras_model():
+    import tensorflow as tf
+    model = tf.keras.Sequential([tf.keras.Input((8,)), tf.keras.layers.Dense(16, activation = 'relu'),
+                                 tf.keras.layers.Dense(2)])
+    return tf, model
+
+
+def build_keras_h5(workdir):
+    _, model = _keras_model()
+    model.save(os.path.join(workdir, 'model.h5'))
+    return 'model.h5', 'model.h5'
+
+
+def build_keras_savedmodel(workdir):
+    tf, model = _keras_model()
+    # Keras 3 only reads back its own format, older versions write a SavedModel directory
+    if int(getattr(tf.keras, '__version__', '2').split('.')[0]) >= 3:
+        os.makedirs(os.path.join(workdir, 'model'))
+        model.save(os.path.join(workdir, 'model', 'model.keras'))
+        output = os.path.join('model', 'model.keras')
+    else:
+        model.save(os.path.join(workdir, 'model'))
+        output = 'model'
+    _zip_dir(os.path.join(workdir, 'model'), os.path.join(workdir, 'model.zip'))
+    return 'model.zip', output
+
+
+def build_spacy(workdir):
+    import spacy
+    nlp = spacy.blank('en')
+    nlp.add_pipe('sentencizer') if hasattr(nlp, 'select_pipes') else nlp.add_pipe(nlp.create_pipe('sentencizer'))
+    nlp.to_disk(os.path.join(workdir, 'pipeline'))
+    _zip_dir(os.path.join(workdir, 'pipeline'), os.path.join(workdir, 'model.zip'))
+    return 'model.zip', 'pipeline'
+
+
+def _build_transformer(workdir, model_class):
+    import transformers
+    path = os.path.join(workdir, 'transformer')
+    os.makedirs(path)
+    with open(os.path.join(path, 'vocab.txt'), 'w') as file:
+        file.write('\n'.join(WORDS))
+    transformers.BertTokenizerFast(os.path.join(path, 'vocab.txt')).save_pretrained(path)
+    config = transformers.BertConfig(vocab_size = len(WORDS), hidden_size = 32, num_hidden_layers = 2,
+                                     num_attention_heads = 2, intermediate_size = 64,
+                                     id2label = {0: 'NEG', 1: 'POS'}, label2id = {'NEG': 0, 'POS': 1})
+    getattr(transformers, model_class)(config).save_pretrained(path)
+    _zip_dir(path, os.path.join(workdir, 'model.zip'))
+    return 'model.zip', 'transformer'
+
+
+def build_classification(workdir):
+    return _build_transformer(workdir, 'BertForSequenceClassification')
+
+
+def build_lm(workdir):
+    return _build_transformer(workdir, 'BertForMaskedLM')
+
+
+def _keras_inputs(items):
+    import numpy as np
+    return np.random.RandomState(0).rand(items, 8).astype('float32')
+
+
+def _text_inputs(items):
+    return [TEXTS[index % len(TEXTS)] for index in range(items)]
+
+
+# name -> (builder, module, class, framework, inputs, single predict, batched predict)
+CASES = {
+    'keras_h5': (build_keras_h5, 'export_keras', 'ModelFromH5', 'tensorflow', _keras_inputs,
+                 lambda loader, x: loader.model(x[None], training = False),
+                 lambda loader, inputs, batch_size: list(loader.predict_stream(iter(inputs), batch_size))),
+    'keras_savedmodel': (build_keras_savedmodel, 'export_keras', 'ModelFromSavedModel', 'tensorflow', _keras_inputs,
+                         lambda loader, x: loader.model(x[None], training = False),
+                         lambda loader, inputs, batch_size: list(loader.predict_stream(iter(inputs), batch_size))),
+    'spacy': (build_spacy, 'export_spacy', 'ModelFromSpacy', 'spacy', _text_inputs,
+              lambda loader, text: loader.model(text),
+              lambda loader, texts, batch_size: list(loader.process(texts, batch_size = batch_size))),
+    'transformer_classification': (build_classification, 'export_transformers', 'ModelFromTransformerForClassification',
+                                   'transformers', _text_inputs,
+                                   lambda loader, text: loader.predict(text),
+                                   lambda loader, texts, batch_size: loader.predict_batch(texts, batch_size = batch_size)),
+    'transformer_lm': (build_lm, 'export_transformers', 'ModelFromTransformerWithLMHead', 'transformers', _text_inputs,
+                       lambda loader, text: loader.predict(text),
+                       lambda loader, texts, batch_size: loader.predict_batch(texts, batch_size = batch_size)),
+}
+
+
+def _peak_rss_mb():
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+def _throughput(function, items):
+    start = time.perf_counter()
+    function()
+    return items / (time.perf_counter() - start)
+
+
+def measure(name, workdir, output, items, batch_size):
+    """
+    Measures one case, run inside a fresh process with the working directory holding its result.json
+    """
+    _, module, class_name, framework, make_inputs, single, batched = CASES[name]
+    os.chdir(workdir)
+    sys.path.insert(0, SRC)
+
+    start = time.perf_counter()
+    importlib.import_module(framework)
+    framework_import = time.perf_counter() - start
+    start = time.perf_counter()
+    loader_class = getattr(importlib.import_module('forest_utils.' + module), class_name)
+    module_import = time.perf_counter() - start
+
+    kwargs = {} if class_name == 'ModelFromH5' else {'output': output}
+    start = time.perf_counter()
+    loader = loader_class(**kwargs)
+    cold_load = time.perf_counter() - start
+    start = time.perf_counter()
+    loader = loader_class(**kwargs)
+    warm_load = time.perf_counter() - start
+
+    inputs = make_inputs(items)
+    start = time.perf_counter()
+    single(loader, inputs[0])
+    first_predict = time.perf_counter() - start
+    batched(loader, inputs[:batch_size], batch_size)
+
+    return {
+        'framework_import_s': framework_import,
+        'import_s': module_import,
+        'cold_load_s': cold_load,
+        'warm_load_s': warm_load,
+        'first_predict_s': first_predict,
+        'single_items_per_s': _throughput(lambda: [single(loader, x) for x in inputs], items),
+        'batched_items_per_s': _throughput(lambda: batched(loader, inputs, batch_size), items),
+        'peak_rss_mb': _peak_rss_mb(),
+    }
+
+
+def _versions():
+    versions = {}
+    for package in ('forest-utils', 'tensorflow', 'tensorflow-cpu', 'spacy', 'transformers', 'torch', 'numpy'):
+        try:
+            from importlib.metadata import version
+            versions[package] = version(package)
+        except Exception:
+            versions[package] = None
+    return versions
+
+
+def _run_case(args, env):
+    return subprocess.run([sys.executable, os.path.abspath(__file__)] + args, env = env,
+                          stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True)
+
+
+def _last_line(text):
+    lines = text.strip().splitlines()
+    return lines[-1] if lines else ''
+
+
+def run(cases, items = 256, batch_size = 32, workdir = None):
+    """
+    Builds the tiny model of every case, seeds the model cache with it and measures it, each step in a subprocess
+
+    Returns
+    -------
+    report : dict
+        environment information and the measurements (or the error) of every case
+    """
+    workdir = workdir or tempfile.mkdtemp(prefix = 'forest-bench-')
+    env = dict(os.environ, FOREST_CACHE_DIR = os.path.join(workdir, 'cache'), TF_CPP_MIN_LOG_LEVEL = '3')
+    os.environ['FOREST_CACHE_DIR'] = env['FOREST_CACHE_DIR']
+    sys.path.insert(0, SRC)
+    from forest_utils.utils import cache
+
+    report = {'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'), 'python': platform.python_version(),
+              'platform': platform.platform(), 'items': items, 'batch_size': batch_size,
+              'versions': _versions(), 'cases': {}}
+    for name in cases:
+        case_dir = os.path.join(workdir, name)
+        os.makedirs(case_dir)
+        # every framework is imported in its own process, TensorFlow and torch do not always coexist
+        process = _run_case(['--build', name, '--workdir', case_dir], env)
+        if process.returncode != 0:
+            report['cases'][name] = {'error': 'could not build the model: {}'.format(_last_line(process.stderr))}
+            continue
+        artifact, output = json.loads(_last_line(process.stdout))
+        file_id = 'bench-' + name
+        with open(os.path.join(case_dir, 'result.json'), 'w') as file:
+            json.dump({'Link': 'https://drive.google.com/file/d/{}/view'.format(file_id)}, file)
+        filename = artifact if artifact == 'model.zip' else output
+        cache.ModelCache().fetch(file_id, filename, lambda path: shutil.copyfile(os.path.join(case_dir, artifact), path))
+
+        process = _run_case(['--measure', name, '--workdir', case_dir, '--model-output', output,
+                             '--items', str(items), '--batch-size', str(batch_size)], env)
+        if process.returncode != 0:
+            report['cases'][name] = {'error': _last_line(process.stderr)}
+        else:
+            report['cases'][name] = json.loads(_last_line(process.stdout))
+    shutil.rmtree(workdir, ignore_errors = True)
+    return report
+
+
+def main(argv = None):
+    parser = argparse.ArgumentParser(description = __doc__.strip().splitlines()[0])
+    parser.add_argument('--cases', nargs = '+', choices = sorted(CASES), default = list(CASES))
+    parser.add_argument('--items', type = int, default = 256, help = 'number of inputs per throughput measurement')
+    parser.add_argument('--batch-size', type = int, default = 32)
+    parser.add_argument('--output', default = 'benchmark.json', help = 'path of the JSON report')
+    parser.add_argument('--build', help = argparse.SUPPRESS)
+    parser.add_argument('--measure', help = argparse.SUPPRESS)
+    parser.add_argument('--workdir', help = argparse.SUPPRESS)
+    parser.add_argument('--model-output', help = argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.build:
+        print(json.dumps(CASES[args.build][0](args.workdir)))
+        return
+    if args.measure:
+        print(json.dumps(measure(args.measure, args.workdir, args.model_output, args.items, args.batch_size)))
+        return
+
+    report = run(args.cases, args.items, args.batch_size)
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent = 2)
+    for name, result in report['cases'].items():
+        if 'error' in result:
+            print('[ERROR]:{}: {}'.format(name, result['error']))
+        else:
+            print('[INFO]:{}: cold load {:.2f} s, warm load {:.3f} s, {:.0f} items/s single, {:.0f} items/s batched, {:.0f} MB peak RSS'.format(
+                name, result['cold_load_s'], result['warm_load_s'], result['single_items_per_s'],
+                result['batched_items_per_s'], result['peak_rss_mb']))
+    print('[INFO]:Report written to {}'.format(args.output))
+
+
+if __name__ == '__main__':
+    main()
@@ -25,7 +25,6 @@ setup(
     author="Smoketrees",
     author_email=" info@smoketrees.dev",
     install_requires=[
-        'gdown==3.11.1',
         'requests==2.24.0',
         'tensorflow==2.3.1',
         'spacy==2.2.0',
@@ -33,4 +32,8 @@ setup(
         'click',
         'transformers',
     ],
+    extras_require={
+        'onnx': ['onnx', 'onnxruntime'],
+        'datasets': ['pyarrow'],
+    },
 )
@@ -1,14 +1,16 @@
-import os
 import click
-import pkg_resources
-from pathlib import Path
 
-from utils import create
-from utils import pull
+from .utils import create
+from .utils import pull
+from .utils import resolve
+from .utils import verify
 
 def get_version():
-    with open(os.path.join('..','..', 'VERSION.txt')) as file:
-        return file.read().split("==")[-1].strip()
+    try:
+        from importlib.metadata import version
+        return version('forest-utils')
+    except Exception:
+        return 'unknown'
 
 INFORMATION = {
     'name': "forest",
@@ -27,11 +29,126 @@ def init(ctx):
     create.create_dir_tree()
 
 
-@main.command(help='Pull models from model zoo')
+def _report(downloaded, seconds):
+    click.echo('\r[INFO]:{:.1f} MB downloaded at {:.1f} MB/s'.format(downloaded / 1e6, downloaded / 1e6 / max(seconds, 1e-6)), nl = False, err = True)
+
+
+@main.command('pull', help='Prefetch models from the model zoo into the local cache')
+@click.argument('models', nargs = -1, required = True)
+@click.option('--jobs', '-j', default = 4, show_default = True, help = "Number of models downloaded concurrently")
+@click.option('--force', '-f', is_flag = True, help = "Download again even if the model is already cached")
+@click.pass_context
+def pull_models(ctx, models, jobs, force):
+    results, throughput = pull.pull_models(models, jobs = jobs, force_download = force, report = _report)
+    if throughput.total:
+        click.echo('', err = True)
+    for model, status in results.items():
+        if isinstance(status, Exception):
+            click.echo('[ERROR]:{}: {}'.format(model, status), err = True)
+        else:
+            click.echo('[INFO]:{}: {}'.format(model, status))
+    click.echo('[INFO]:{:.1f} MB in {:.1f} s ({:.1f} MB/s)'.format(throughput.total / 1e6, throughput.elapsed,
+                                                               throughput.total / 1e6 / max(throughput.elapsed, 1e-6)))
+    if any(isinstance(status, Exception) for status in results.values()):
+        ctx.exit(1)
+
+
+@main.command('verify', help='Check model artifacts against the sizes and SHA-256 recorded in result.json')
+@click.argument('files', nargs = -1)
+@click.option('--config', '-c', default = 'result.json', show_default = True, help = "Model zoo name, result.json or folder containing one")
+@click.option('--update', '-u', is_flag = True, help = "Record the sizes and SHA-256 of FILES in result.json instead of checking them")
+@click.option('--jobs', '-j', default = 4, show_default = True, help = "Number of files hashed in parallel")
 @click.pass_context
-@click.option('--all', '-a', is_flag=True, help="Pull all the files from the github origin")
-def pull(ctx, docker):
-    pull.get_files()
+def verify_files(ctx, files, config, update, jobs):
+    import os
+    from .utils import cache
+
+    if update:
+        if not files:
+            raise click.UsageError('FILES are required with --update')
+        path = os.path.join(config, 'result.json') if os.path.isdir(config) else config
+        for entry in verify.update_config(path, files, jobs)['Files']:
+            click.echo('[INFO]:{Name}: {Size} bytes, SHA-256 {SHA256}'.format(**entry))
+        return
+
+    try:
+        model_config = resolve.resolve_config(config)
+    except IOError as error:
+        raise click.ClickException(str(error))
+    if not files:
+        # the artifact of the model in the local cache
+        filename = pull.artifact_name(model_config)
+        _, checksum = verify.expected(model_config, filename)
+        model_cache = cache.ModelCache()
+        entry = model_cache.entry_dir(model_cache.key(cache.get_file_id(model_config['Link']), checksum))
+        files = [os.path.join(entry, filename)]
+    results = verify.verify_files(files, model_config, jobs)
+    for path, problem in results.items():
+        if problem is None:
+            click.echo('[INFO]:{}: OK'.format(path))
+        else:
+            click.echo('[ERROR]:{}: {}'.format(path, problem), err = True)
+    if any(problem is not None for problem in results.values()):
+        ctx.exit(1)
+
+
+LOADERS = {
+    'h5': ('export_keras', 'ModelFromH5'),
+    'savedmodel': ('export_keras', 'ModelFromSavedModel'),
+    'spacy': ('export_spacy', 'ModelFromSpacy'),
+    'classification': ('export_transformers', 'ModelFromTransformerForClassification'),
+    'lm': ('export_transformers', 'ModelFromTransformerWithLMHead'),
+    'onnx': ('export_onnx', 'ModelFromOnnx'),
+}
+
+
+def _make_loader(loader, model, output, offline):
+    import importlib
+
+    module, name = LOADERS[loader]
+    loader_class = getattr(importlib.import_module('.' + module, __package__), name)
+    if output is None and loader not in ('h5', 'onnx'):
+        raise click.UsageError('--output is required for the {} loader'.format(loader))
+    try:
+        return loader_class(**({'output': output} if output else {}), lazy = True, config = model, offline = offline or None)
+    except IOError as error:
+        raise click.ClickException(str(error))
+
+
+@main.command('serve', help='Serve a model zoo entry (name, folder or result.json) over HTTP with dynamic micro-batching')
+@click.argument('model')
+@click.option('--loader', '-l', type = click.Choice(sorted(LOADERS)), required = True, help = "Loader class used for the model")
+@click.option('--output', '-o', default = None, help = "Path of the model inside the downloaded archive (or the h5 file name)")
+@click.option('--host', default = '127.0.0.1', show_default = True)
+@click.option('--port', '-p', default = 8000, show_default = True)
+@click.option('--max-batch-size', default = 32, show_default = True, help = "Maximum number of inputs per batch")
+@click.option('--max-latency', default = 10.0, show_default = True, help = "Maximum milliseconds an input waits for its batch to fill up")
+@click.option('--offline', is_flag = True, default = None, help = "Only serve the model from the local cache, never download it")
+@click.pass_context
+def serve_model(ctx, model, loader, output, host, port, max_batch_size, max_latency, offline):
+    from . import serve
+
+    model = _make_loader(loader, model, output, offline)
+    serve.serve(model, host = host, port = port, max_batch_size = max_batch_size, max_latency = max_latency / 1000)
+
+
+@main.command('export-onnx', help='Export a model zoo entry (name, folder or result.json) to ONNX for ModelFromOnnx')
+@click.argument('model')
+@click.option('--loader', '-l', type = click.Choice(['classification', 'h5', 'lm']), required = True, help = "Loader class used for the model")
+@click.option('--output', '-o', default = None, help = "Path of the model inside the downloaded archive (or the h5 file name)")
+@click.option('--to', '-t', 'path', default = 'onnx', show_default = True, help = "Folder the ONNX model is written to")
+@click.option('--opset', default = 14, show_default = True, help = "ONNX opset version")
+@click.option('--offline', is_flag = True, default = None, help = "Only export the model from the local cache, never download it")
+@click.pass_context
+def export_model(ctx, model, loader, output, path, opset, offline):
+    from . import export_onnx
+
+    model = _make_loader(loader, model, output, offline)
+    try:
+        model.load()
+    except Exception as error:
+        raise click.ClickException('{} failed to load the model: {}'.format(type(model).__name__, error))
+    click.echo('[INFO]:Exported to {}'.format(export_onnx.export(model, path, opset = opset)))
 
 if __name__ == "__main__":
     main()
@@ -1,21 +1,62 @@
 import os
-import gdown
+import time
 import pickle
+import threading
 
-import pandas as pd
+from .utils import download
+from .utils import metrics
+from .utils import resolve
+from .utils.imports import lazy_import
+
+pd = lazy_import('pandas')
+feather = lazy_import('pyarrow.feather')
+parquet = lazy_import('pyarrow.parquet')
+
+COLUMNAR_FORMATS = {'feather': '.feather', 'parquet': '.parquet'}
+# file names of datasets downloaded before the registry supported every entry
+LEGACY_FILENAMES = {'emotion_tweets': 'tweets.csv'}
+
+# registry indexes memoized per process: path -> (mtime, index) and path -> time of the last ETag check
+_indexes = {}
+_index_checks = {}
+_index_lock = threading.Lock()
 
 
 class Datasets(object):
     """
     A class for managing downloads and loading of SmokTrees' datasets
+
+    The registry index ('datasets.pickle') is downloaded once, unpickled once per process and
+    only read again when the file on disk changes. With 'index_ttl' set, the index is also
+    checked against the server's ETag at most once every 'index_ttl' seconds.
+
+    Parameters
+    ----------
+    output : str
+        path of the registry index file (by default it is 'datasets.pickle')
+    index_ttl : float
+        seconds after which the index is revalidated against the server (never by default)
+    offline : bool
+        only use files already downloaded and fail fast otherwise (by default $FOREST_OFFLINE)
+
+    Methods
+    -------
+    names()
+        returns the names of all datasets in the registry
+    get(name, ...)
+        downloads a dataset of the registry and loads it into pandas
+    get_emo_tweets(...)
+        shortcut for get('emotion_tweets', ...)
     """
 
-    def __init__(self, output = 'datasets.pickle', config = 'result.json'):
+    def __init__(self, output = 'datasets.pickle', config = 'result.json', index_ttl = None, offline = None):
         super().__init__()
         
         self.base_url = 'https://drive.google.com/uc?id='
         self.url_id = self.get_complete_url('https://drive.google.com/file/d/10G-d7rdIHsQ9s8XE1mgs6t-hfQjVD-KA/view?usp=sharing')
         self.output = output
+        self.index_ttl = index_ttl
+        self.offline = resolve.is_offline(offline)
         
     def get_complete_url(self, url):
         """
@@ -35,12 +76,160 @@ class Datasets(object):
         split_url = url.split('/')
         return self.base_url + split_url[5]
     
-    def get_emo_tweets(self, force_download = False):
+    def _index_changed(self, path):
+        """
+        method (used internally inside class) to check the index against the server's ETag, at most every 'index_ttl' seconds
+        """
+        if self.index_ttl is None or self.offline or time.time() - _index_checks.get(path, 0) < self.index_ttl:
+            return False
+        _index_checks[path] = time.time()
+        etag = download.get_etag(self.url_id)
+        etag_path = path + '.etag'
+        saved = None
+        if os.path.exists(etag_path):
+            with open(etag_path, 'r') as file:
+                saved = file.read()
+        if etag is not None and etag != saved:
+            with open(etag_path, 'w') as file:
+                file.write(etag)
+        return saved is not None and etag is not None and etag != saved
+
+    def get_index(self, force_download = False):
+        """
+        method to get the registry index, downloading it only if missing or changed
+
+        Returns
+        -------
+        index : dict
+            maps dataset names to their entries (each with a 'link')
+        """
+        path = os.path.abspath(self.output)
+        with _index_lock:
+            if not os.path.exists(path) or force_download or self._index_changed(path):
+                self._download(self.url_id, path, 'index')
+            mtime = os.path.getmtime(path)
+            if path not in _indexes or _indexes[path][0] != mtime:
+                with open(path, 'rb') as file:
+                    _indexes[path] = (mtime, pickle.load(file))
+            return _indexes[path][1]
+
+    def _download(self, url, path, name):
+        """
+        method (used internally inside class) to download a file of the registry, reporting its metrics
+        """
+        metrics.emit('cache_misses', 1, dataset = name)
+        if self.offline:
+            raise resolve.OfflineError("{} has not been downloaded to {} and cannot be in offline mode".format(name, path))
+        with metrics.phase('download', dataset = name):
+            download.download(url, path)
+        metrics.emit('download_bytes', os.path.getsize(path), dataset = name)
+
+    def names(self):
+        """
+        method to list the names of all datasets in the registry
+        """
+        return sorted(self.get_index())
+
+    def _to_columnar(self, csv, path, columnar, dtype = None, categories = None):
+        """
+        method (used internally inside class) to convert a downloaded csv into a columnar cache file
+
+        The feather file is written uncompressed so that it can be memory-mapped without decoding.
+        """
+        frame = self._set_dtypes(pd.read_csv(csv, dtype = dtype), None, categories)
+        tmp = path + '.tmp'
+        if columnar == 'feather':
+            feather.write_feather(frame, tmp, compression = 'uncompressed')
+        else:
+            frame.to_parquet(tmp, index = False)
+        os.replace(tmp, path)
+
+    def _read_columnar(self, path, columnar, usecols = None, chunksize = None):
+        """
+        method (used internally inside class) to memory-map a columnar cache file
+
+        Returns a DataFrame, or a generator of DataFrames with 'chunksize' rows each if it is given.
+        """
+        if columnar == 'feather':
+            table = feather.read_table(path, columns = usecols, memory_map = True)
+        else:
+            table = parquet.read_table(path, columns = usecols, memory_map = True)
+        if chunksize is None:
+            return table.to_pandas()
+        return (table.slice(offset, chunksize).to_pandas() for offset in range(0, table.num_rows, chunksize))
+
+    def _set_dtypes(self, frame, dtype = None, categories = None):
+        """
+        method (used internally inside class) to apply explicit dtypes and categoricals to a DataFrame
+        """
+        if dtype:
+            frame = frame.astype({column: kind for column, kind in dtype.items() if column in frame})
+        for column in categories or ():
+            if column in frame:
+                frame[column] = frame[column].astype('category')
+        return frame
+
+    def get(self, name, force_download = False, usecols = None, dtype = None, categories = None,
+            chunksize = None, columnar = None):
+        """
+        method to download a dataset of the registry and load it into pandas
+
+        Parameters
+        ----------
+        name : str
+            name of the dataset in the registry (see names())
+        force_download : bool
+            download the dataset again even if it is present
+        usecols : list
+            only load these columns
+        dtype : dict
+            explicit dtype per column instead of letting pandas infer them
+        categories : list
+            columns (e.g. the label columns) to load as pandas categoricals
+        chunksize : int
+            return an iterator of DataFrames with 'chunksize' rows each instead of one DataFrame
+        columnar : str
+            'feather' or 'parquet' to convert the csv once into a columnar cache next to it and
+            memory-map that cache on every later call
+
+        Returns
+        -------
+        dataset : DataFrame or iterator of DataFrames
+        """
         try:
-            if(not os.path.exists(self.output) or force_download):
-                gdown.download(self.url_id, self.output, quiet = False)
-            if(not os.path.exists('tweets.csv') or force_download): 
-                gdown.download(self.get_complete_url(pickle.load(open(self.output, 'rb'))['emotion_tweets']['link']), 'tweets.csv', quiet = False)
-            return pd.read_csv('tweets.csv')
+            filename = LEGACY_FILENAMES.get(name, name + '.csv')
+            if(not os.path.exists(filename) or force_download):
+                with metrics.phase('resolve', dataset = name):
+                    link = self.get_index(force_download)[name]['link']
+                self._download(self.get_complete_url(link), filename, name)
+            else:
+                metrics.emit('cache_hits', 1, dataset = name)
+
+            if columnar is not None:
+                path = os.path.splitext(filename)[0] + COLUMNAR_FORMATS[columnar]
+                if not os.path.exists(path) or force_download:
+                    with metrics.phase('extract', dataset = name):
+                        self._to_columnar(filename, path, columnar, dtype, categories)
+                with metrics.phase('deserialize', dataset = name):
+                    dataset = self._read_columnar(path, columnar, usecols, chunksize)
+                if chunksize is None:
+                    return self._set_dtypes(dataset, dtype, categories)
+                return (self._set_dtypes(chunk, dtype, categories) for chunk in dataset)
+
+            if categories:
+                dtype = dict(dtype or {}, **{column: 'category' for column in categories})
+            with metrics.phase('deserialize', dataset = name):
+                return pd.read_csv(filename, usecols = usecols, dtype = dtype, chunksize = chunksize)
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
         except:
-            print("[ERROR]:Error in loading dataset, please check downloaded file")
\ No newline at end of file
+            print("[ERROR]:Error in loading dataset, please check downloaded file")
+
+    def get_emo_tweets(self, force_download = False, usecols = None, dtype = None, categories = None,
+                       chunksize = None, columnar = None):
+        """
+        method to download the emotion tweets dataset and load it into pandas, see get() for the parameters
+        """
+        return self.get('emotion_tweets', force_download = force_download, usecols = usecols, dtype = dtype,
+                        categories = categories, chunksize = chunksize, columnar = columnar)
@@ -1,12 +1,104 @@
 import os
-import json
-import gdown
-import zipfile
+import itertools
 
-import tensorflow as tf
+from .utils import cache
+from .utils import metrics
+from .utils import resolve
+from .utils import verify
+from .utils.imports import lazy_import
+from .loading import LazyLoader
 
+tf = lazy_import('tensorflow')
+np = lazy_import('numpy')
 
-class ModelFromH5(object):
+
+def _predict_stream(model, predict_fns, iterable, batch_size = 32, preprocess = None):
+    """
+    Yields the model's predictions for 'iterable' batch by batch.
+
+    The inputs are fed through a tf.data pipeline (parallel 'preprocess' map, batching, prefetch) and
+    the model is called through a tf.function whose input signature has an unknown batch dimension,
+    so it is traced once instead of once per batch shape. The compiled functions are kept in
+    'predict_fns' keyed by input signature and reused across calls.
+    """
+    iterator = iter(iterable)
+    try:
+        first = next(iterator)
+    except StopIteration:
+        return
+    spec = tf.nest.map_structure(lambda value: tf.TensorSpec.from_tensor(tf.convert_to_tensor(value)), first)
+
+    def generator():
+        return itertools.chain([first], iterator)
+
+    # output_signature is only available from TensorFlow 2.4
+    if tuple(int(part) for part in tf.__version__.split('.')[:2]) >= (2, 4):
+        dataset = tf.data.Dataset.from_generator(generator, output_signature = spec)
+    else:
+        dataset = tf.data.Dataset.from_generator(generator, output_types = tf.nest.map_structure(lambda item: item.dtype, spec),
+                                                 output_shapes = tf.nest.map_structure(lambda item: item.shape, spec))
+    if preprocess is not None:
+        dataset = dataset.map(preprocess, num_parallel_calls = tf.data.experimental.AUTOTUNE)
+    dataset = dataset.batch(batch_size).prefetch(tf.data.experimental.AUTOTUNE)
+
+    signature = dataset.element_spec
+    key = repr(signature)
+    if key not in predict_fns:
+        predict_fns[key] = tf.function(lambda inputs: model(inputs, training = False), input_signature = [signature])
+    predict = predict_fns[key]
+
+    for batch in dataset:
+        yield tf.nest.map_structure(lambda tensor: tensor.numpy(), predict(batch))
+
+
+def _empty_predictions(model):
+    """
+    Returns the predictions of 'model' for no inputs, which Keras' predict() fails to compute
+    """
+    if isinstance(model.output_shape, list):
+        return [np.empty((0,) + tuple(shape[1:]), dtype = np.float32) for shape in model.output_shape]
+    return np.empty((0,) + tuple(model.output_shape[1:]), dtype = np.float32)
+
+
+def _split_rows(values):
+    """
+    Splits a batch of model inputs or outputs (an array, a list of arrays or a dict of arrays) into its rows
+    """
+    if isinstance(values, dict):
+        names = list(values)
+        return [dict(zip(names, row)) for row in zip(*(np.asarray(values[name]) for name in names))]
+    if isinstance(values, (list, tuple)):
+        return list(zip(*(np.asarray(value) for value in values)))
+    return list(np.asarray(values))
+
+
+def _stack_rows(rows):
+    """
+    Joins rows split by _split_rows() back into a batch
+    """
+    if isinstance(rows[0], dict):
+        return {name: np.stack([row[name] for row in rows]) for name in rows[0]}
+    if isinstance(rows[0], tuple):
+        return [np.stack(column) for column in zip(*rows)]
+    return np.stack(rows)
+
+
+def _predict(loader, inputs, batch_size):
+    """
+    Returns model.predict(inputs) of a Keras loader, taking the rows predicted before from its result cache
+    """
+    model = loader.model
+    # a list of arrays is one array per input of multi-input models, and the rows of single-input ones
+    rows = _split_rows(inputs if isinstance(inputs, dict) or len(model.inputs) > 1 else np.asarray(inputs))
+    if not rows:
+        return _empty_predictions(model)
+    if loader.result_cache is None:
+        return model.predict(inputs, batch_size = batch_size)
+    return _stack_rows(loader._memoized('predict', rows,
+                                        lambda misses: _split_rows(model.predict(_stack_rows(misses), batch_size = batch_size))))
+
+
+class ModelFromH5(LazyLoader):
     """
     A class for managing downloads and loading of .h5 models
 
@@ -14,6 +106,12 @@ class ModelFromH5(object):
     ----------
     output : str
         path to output file for downloading the model (by default it is 'model.h5')
+    lazy : bool
+        defer downloading and loading the model until it is first used (by default it is False)
+    config : str or dict
+        model zoo name, path to a result.json or a folder containing one (by default the result.json of the working directory)
+    offline : bool
+        only load the model from the local cache and fail fast if it is missing (by default $FOREST_OFFLINE)
     
     Attributes
     ----------
@@ -30,15 +128,25 @@ class ModelFromH5(object):
         method to get complete link from the given url
     _load_model()
         download the model .h5 file from the url to output route and returns the loaded keras model
+    predict(inputs, batch_size=32)
+        returns the predictions of the model for an array of inputs, memoized after memoize()
+    predict_stream(iterable, batch_size=32, preprocess=None)
+        yields the predictions of the model for a stream of inputs, batch by batch
     """
 
-    def __init__(self, output = 'model.h5'):
+    def __init__(self, output = 'model.h5', lazy = False, config = 'result.json', offline = None):
         super().__init__()
         
         self.base_url = 'https://drive.google.com/uc?id='
-        self.url_id = self._get_complete_url(json.load(open('result.json', 'r'))['Link'])
+        with metrics.phase('resolve', loader = type(self).__name__):
+            config = resolve.resolve_config(config, offline = offline)
+        self.url_id = self._get_complete_url(config['Link'])
+        self.file_id = cache.get_file_id(config['Link'])
+        self.size, self.checksum = verify.expected(config, output)
         self.output = output
-        self.model = self._load_model()
+        self.offline = offline
+        self._predict_fns = {}
+        self._setup_loading(lazy)
         
     def _get_complete_url(self, url):
         """
@@ -68,15 +176,55 @@ class ModelFromH5(object):
             downloaded model loaded into keras model ready to use!
         """
         try:
-            if(not os.path.exists(self.output) or force_download):
-                gdown.download(self.url_id, self.output, quiet = False)
-            return tf.keras.models.load_model(self.output)
+            path = cache.fetch(self.url_id, self.file_id, self.output, checksum = self.checksum, force_download = force_download,
+                               offline = self.offline, size = self.size)
+            with metrics.phase('deserialize', loader = type(self).__name__):
+                return tf.keras.models.load_model(path)
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
         except:
             print("[ERROR]:Error in loading model, please check downloaded file")
+            raise
+
+    @metrics.first_predict
+    def predict(self, inputs, batch_size = 32):
+        """
+        Returns the predictions of the model for an array of inputs.
+
+        After memoize() only the rows not predicted before are passed to the model.
+
+        Parameter
+        ---------
+            inputs : numpy array with one input per row (a list or dict of them for multi-input models).
+            batch_size : Number of inputs per batch.
+
+        Returns
+        -------
+            numpy array with one prediction per row of 'inputs' (a list of them for multi-output models)
+        """
+        return _predict(self, inputs, batch_size)
+
+    @metrics.first_predict
+    def predict_stream(self, iterable, batch_size = 32, preprocess = None):
+        """
+        Yields the predictions of the model batch by batch, so memory stays bounded on large inputs.
+
+        Parameter
+        ---------
+            iterable : Iterable of single (unbatched) model inputs, consumed lazily.
+            batch_size : Number of inputs per batch.
+            preprocess : Optional TensorFlow function mapped over the inputs in parallel before batching.
+
+        Returns
+        -------
+            generator of numpy arrays with the predictions of each batch
+        """
+        return _predict_stream(self.model, self._predict_fns, iterable, batch_size, preprocess)
     
 
     
-class ModelFromSavedModel(object):
+class ModelFromSavedModel(LazyLoader):
     """
     A class for managing downloading and loading of tf models.
 
@@ -87,9 +235,11 @@ class ModelFromSavedModel(object):
     url_id : str
         The complete url to the required tf model.
     output : str
-        Relative path to the output file for the downloaded model.
+        Path of the model inside the extracted archive.
     zip : str
-        Path to the zip file (by default it is 'model.zip').
+        Name of the zip file in the model cache (by default it is 'model.zip').
+    keep_archive : bool
+        Whether the zip file is kept in the model cache after extraction.
     
     Methods
     -------
@@ -97,24 +247,39 @@ class ModelFromSavedModel(object):
         Returns the complete url to the required tf Model.
     _load_model():
         Downloads the model from the url to the output route and loads the model if successful, otherwise returns an error.
+    predict(inputs, batch_size=32):
+        Returns the predictions of the model for an array of inputs, memoized after memoize().
+    predict_stream(iterable, batch_size=32, preprocess=None):
+        Yields the predictions of the model for a stream of inputs, batch by batch.
 
     """
-    def __init__(self, output):
+    def __init__(self, output, keep_archive = True, lazy = False, config = 'result.json', offline = None):
         """
         Constructs all the necessary attributes for the ModelFromSavedModel Object.
 
         Parameter
         ----------
-            output: Path to the 'output' file for saving the downloaded model.
+            output: Path of the model inside the downloaded archive.
+            keep_archive: Keep the downloaded zip in the cache after extracting it (set to False to save disk space).
+            lazy: Defer downloading and loading the model until it is first used.
+            config: Model zoo name, path to a result.json or a folder containing one (the result.json of the working directory by default).
+            offline: Only load the model from the local cache and fail fast if it is missing ($FOREST_OFFLINE by default).
 
         """
         super().__init__()
         
         self.base_url = 'https://drive.google.com/uc?id='
-        self.url_id = self._get_complete_url(json.load(open('result.json','r'))["Link"])
+        with metrics.phase('resolve', loader = type(self).__name__):
+            config = resolve.resolve_config(config, offline = offline)
+        self.url_id = self._get_complete_url(config["Link"])
+        self.file_id = cache.get_file_id(config["Link"])
+        self.size, self.checksum = verify.expected(config, 'model.zip')
         self.output = output
         self.zip = 'model.zip'
-        self.model = self._load_model()
+        self.keep_archive = keep_archive
+        self.offline = offline
+        self._predict_fns = {}
+        self._setup_loading(lazy)
         
     def _get_complete_url(self, url):
         """
@@ -135,17 +300,56 @@ class ModelFromSavedModel(object):
         """
 
         try:
-            if(not os.path.exists(self.zip) or force_download):
-                gdown.download(self.url_id, self.zip, quiet = False)
-            if not os.path.exists(self.output):
-                with zipfile.ZipFile(self.zip, 'r') as zip_ref:
-                    zip_ref.extractall()
-            return tf.keras.models.load_model(self.output)
+            target = cache.fetch_extracted(self.url_id, self.file_id, self.zip, checksum = self.checksum,
+                                           force_download = force_download, keep_archive = self.keep_archive,
+                                           offline = self.offline, size = self.size)
+            path = os.path.join(target, self.output)
+            with metrics.phase('deserialize', loader = type(self).__name__):
+                return tf.keras.models.load_model(path)
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
         except:
             print("[ERROR]:Error in loading model, please check downloaded file")
+            raise
+
+    @metrics.first_predict
+    def predict(self, inputs, batch_size = 32):
+        """
+        Returns the predictions of the model for an array of inputs.
+
+        After memoize() only the rows not predicted before are passed to the model.
+
+        Parameter
+        ---------
+            inputs : numpy array with one input per row (a list or dict of them for multi-input models).
+            batch_size : Number of inputs per batch.
+
+        Returns
+        -------
+            numpy array with one prediction per row of 'inputs' (a list of them for multi-output models)
+        """
+        return _predict(self, inputs, batch_size)
+
+    @metrics.first_predict
+    def predict_stream(self, iterable, batch_size = 32, preprocess = None):
+        """
+        Yields the predictions of the model batch by batch, so memory stays bounded on large inputs.
+
+        Parameter
+        ---------
+            iterable : Iterable of single (unbatched) model inputs, consumed lazily.
+            batch_size : Number of inputs per batch.
+            preprocess : Optional TensorFlow function mapped over the inputs in parallel before batching.
+
+        Returns
+        -------
+            generator of numpy arrays with the predictions of each batch
+        """
+        return _predict_stream(self.model, self._predict_fns, iterable, batch_size, preprocess)
 
 
-class ModelFromCheckpoint(object):
+class ModelFromCheckpoint(LazyLoader):
     """
     A class for managing downloading and loading of tf models.
 
@@ -156,9 +360,13 @@ class ModelFromCheckpoint(object):
     url_id : str
         The complete url to the required tf model.
     output : str
-        Relative path to the output file for the downloaded model.
+        Path of the model inside the extracted archive.
     zip : str
-        Path to the zip file (by default it is 'model.zip').
+        Name of the zip file in the model cache (by default it is 'model.zip').
+    keep_archive : bool
+        Whether the zip file is kept in the model cache after extraction.
+    step : int
+        Step of the checkpoint to restore (the latest one if None).
     
     Methods
     -------
@@ -166,26 +374,46 @@ class ModelFromCheckpoint(object):
         Returns the complete url to the required tf Model.
     _load_model():
         Downloads the model from the url to the output route and loads the model if successful, otherwise returns an error.
+    _checkpoint_path(path):
+        Returns the prefix of the checkpoint to restore from the checkpoint directory.
 
     """
-    def __init__(self, model_obj, optimizer):
+    def __init__(self, model_obj, optimizer = None, keep_archive = True, lazy = False, checkpoint_dir = 'checkpoints',
+                 step = None, model_key = 'transformer', config = 'result.json', offline = None):
         """
         Constructs all the necessary attributes for the ModelFromSavedCheckpoint Object.
 
         Parameter
         ----------
-            output: Path to the 'output' file for saving the downloaded model.
+            model_obj: Model whose variables are restored from the checkpoint.
+            optimizer: Optimizer whose slots are restored from the checkpoint. Leave it None for inference to
+                       restore only the model variables and skip the optimizer slots.
+            keep_archive: Keep the downloaded zip in the cache after extracting it (set to False to save disk space).
+            lazy: Defer downloading and loading the model until it is first used.
+            checkpoint_dir: Directory of the checkpoints inside the downloaded archive.
+            step: Step of the checkpoint to restore, e.g. 5 for 'ckpt-5' (the latest one if None).
+            model_key: Name the model was saved under in the tf.train.Checkpoint.
+            config: Model zoo name, path to a result.json or a folder containing one (the result.json of the working directory by default).
+            offline: Only load the model from the local cache and fail fast if it is missing ($FOREST_OFFLINE by default).
 
         """
         super().__init__()
         
         self.base_url = 'https://drive.google.com/uc?id='
-        self.url_id = self._get_complete_url(json.load(open('result.json','r'))["Link"])
-        self.output = "checkpoints"
+        with metrics.phase('resolve', loader = type(self).__name__):
+            config = resolve.resolve_config(config, offline = offline)
+        self.url_id = self._get_complete_url(config["Link"])
+        self.file_id = cache.get_file_id(config["Link"])
+        self.size, self.checksum = verify.expected(config, 'model.zip')
+        self.output = checkpoint_dir
         self.zip = 'model.zip'
+        self.keep_archive = keep_archive
         self.model_obj = model_obj
         self.optimizer = optimizer
-        self.model = self._load_model()
+        self.step = step
+        self.model_key = model_key
+        self.offline = offline
+        self._setup_loading(lazy)
         
     def _get_complete_url(self, url):
         """
@@ -206,21 +434,53 @@ class ModelFromCheckpoint(object):
         """
 
         try:
-            if(not os.path.exists(self.zip) or force_download):
-                gdown.download(self.url_id, self.zip, quiet = False)
-            if not os.path.exists(self.output):
-                with zipfile.ZipFile(self.zip, 'r') as zip_ref:
-                    zip_ref.extractall()
-            checkpoint_path = "checkpoints"
-
-            ckpt = tf.train.Checkpoint(transformer = self.model_obj,
-                                       optimizer = self.optimizer)
-            
-            ckpt_manager = tf.train.CheckpointManager(ckpt, checkpoint_path, max_to_keep = 1)
-            
-            if ckpt_manager.latest_checkpoint:
-              ckpt.restore(ckpt_manager.latest_checkpoint)
-              print ('[INFO]:Latest checkpoint restored!')
+            target = cache.fetch_extracted(self.url_id, self.file_id, self.zip, checksum = self.checksum,
+                                           force_download = force_download, keep_archive = self.keep_archive,
+                                           offline = self.offline, size = self.size)
+            path = os.path.join(target, self.output)
+            objects = {self.model_key: self.model_obj}
+            if self.optimizer is not None:
+                objects['optimizer'] = self.optimizer
+            ckpt = tf.train.Checkpoint(**objects)
+
+            checkpoint_path = self._checkpoint_path(path)
+            if checkpoint_path:
+                with metrics.phase('deserialize', loader = type(self).__name__):
+                    status = ckpt.restore(checkpoint_path)
+                if self.optimizer is None:
+                    # the optimizer slots stored in the checkpoint are intentionally left unrestored
+                    status.expect_partial()
+                print ('[INFO]:Checkpoint {} restored!'.format(os.path.basename(checkpoint_path)))
             return self.model_obj
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
         except:
             print("[ERROR]:Error in loading model, please check downloaded file")
+            raise
+
+    def _checkpoint_path(self, path):
+        """
+        Returns the prefix of the checkpoint of 'step' (or the latest one) in the directory 'path'.
+
+        Without a 'step', None is returned if the directory holds no checkpoint. A requested 'step'
+        that is missing raises a ValueError listing the available steps.
+
+        Parameter
+        ---------
+            path : Directory containing the checkpoints and their 'checkpoint' state file.
+
+        """
+        if self.step is None:
+            return tf.train.latest_checkpoint(path)
+        state = tf.train.get_checkpoint_state(path)
+        candidates = list(state.all_model_checkpoint_paths) if state else []
+        for candidate in candidates:
+            if candidate.rsplit('-', 1)[-1] == str(self.step):
+                return os.path.join(path, os.path.basename(candidate))
+        prefix = os.path.join(path, 'ckpt-{}'.format(self.step))
+        if tf.io.gfile.exists(prefix + '.index'):
+            return prefix
+        prefixes = candidates + [name[:-len('.index')] for name in tf.io.gfile.listdir(path) if name.endswith('.index')]
+        steps = sorted({prefix.rsplit('-', 1)[-1] for prefix in prefixes}, key = lambda step: (len(step), step))
+        raise ValueError("No checkpoint of step {} in {}, available steps: {}".format(self.step, path, ', '.join(steps) or 'none'))
@@ -0,0 +1,381 @@
+import os
+import json
+import inspect
+import importlib
+
+from .utils import cache
+from .utils import metrics
+from .utils import resolve
+from .utils import verify
+from .loading import LazyLoader
+from .utils.imports import lazy_import
+from .export_keras import ModelFromH5
+from .export_transformers import ModelFromTransformerForClassification, ModelFromTransformerWithLMHead, _padded_batches
+
+np = lazy_import('numpy')
+torch = lazy_import('torch')
+tf = lazy_import('tensorflow')
+onnx = lazy_import('onnx')
+ort = lazy_import('onnxruntime')
+transformers = lazy_import('transformers')
+
+MODEL_FILE = 'model.onnx'
+# key of the model metadata describing how the model was exported
+METADATA_KEY = 'forest'
+OPTIMIZATION_LEVELS = {
+    'disable': 'ORT_DISABLE_ALL',
+    'basic': 'ORT_ENABLE_BASIC',
+    'extended': 'ORT_ENABLE_EXTENDED',
+    'all': 'ORT_ENABLE_ALL',
+}
+
+
+def _softmax(logits):
+    exp = np.exp(logits - logits.max(axis = -1, keepdims = True))
+    return exp / exp.sum(axis = -1, keepdims = True)
+
+
+def _set_metadata(onnx_path, **metadata):
+    """
+    Stores 'metadata' as JSON in the model properties of the ONNX file, which ModelFromOnnx reads back
+    """
+    model = onnx.load(onnx_path, load_external_data = False)
+    onnx.helper.set_model_props(model, {METADATA_KEY: json.dumps(metadata)})
+    onnx.save(model, onnx_path)
+
+
+def _load_tokenizer(path):
+    """
+    Loads the tokenizer saved next to an exported model, without importing torch for fast tokenizers (AutoTokenizer imports it)
+    """
+    if os.path.exists(os.path.join(path, 'tokenizer.json')):
+        return transformers.PreTrainedTokenizerFast.from_pretrained(path)
+    return transformers.AutoTokenizer.from_pretrained(path)
+
+
+def _logits_module(model):
+    """
+    Wraps a transformers model into a module taking (input_ids, attention_mask) and returning the logits tensor only
+    """
+    class Logits(torch.nn.Module):
+
+        def __init__(self):
+            super().__init__()
+
+            self.model = model
+
+        def forward(self, input_ids, attention_mask):
+            return self.model(input_ids = input_ids, attention_mask = attention_mask)[0]
+
+    return Logits().eval()
+
+
+def export_transformer(loader, path, opset = 14):
+    """
+    Exports the model and tokenizer of a transformer loader to the folder 'path'
+
+    The model is traced with torch's TorchScript based exporter, with the batch and sequence
+    dimensions left dynamic. The tokenizer is saved next to 'model.onnx'.
+
+    Parameters
+    ----------
+    loader : ModelFromTransformerForClassification or ModelFromTransformerWithLMHead
+        loader of the model, loaded if it is not yet
+    path : str
+        folder the model is exported to
+    opset : int
+        ONNX opset version of the exported graph
+    """
+    if loader.cpu_optimize:
+        raise ValueError("int8 quantized models cannot be exported, load the model without cpu_optimize")
+    classification = isinstance(loader, ModelFromTransformerForClassification)
+    tokenizer, model = loader.tokenizer, loader.model
+
+    os.makedirs(path, exist_ok = True)
+    onnx_path = os.path.join(path, MODEL_FILE)
+    sample = tokenizer(['forest utils'], return_tensors = 'pt')
+    inputs = (sample['input_ids'].to(loader.device), sample['attention_mask'].to(loader.device))
+    axes = {'input_ids': {0: 'batch', 1: 'sequence'}, 'attention_mask': {0: 'batch', 1: 'sequence'},
+            'logits': {0: 'batch'} if classification else {0: 'batch', 1: 'sequence'}}
+    # the TorchScript exporter does not need onnxscript, newer torch versions default to the dynamo one
+    options = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(_logits_module(model), inputs, onnx_path, input_names = ['input_ids', 'attention_mask'],
+                          output_names = ['logits'], dynamic_axes = axes, opset_version = opset,
+                          do_constant_folding = True, **options)
+    tokenizer.save_pretrained(path)
+
+    if classification:
+        id2label = {str(i): label for i, label in model.config.id2label.items()}
+        _set_metadata(onnx_path, task = 'classification', id2label = id2label)
+    else:
+        _set_metadata(onnx_path, task = 'lm')
+    return onnx_path
+
+
+def export_keras(loader, path, opset = 14):
+    """
+    Exports the Keras model of a ModelFromH5 loader to the folder 'path' through tf2onnx
+
+    Keras 3 models are exported with model.export(format='onnx'), older ones with
+    tf2onnx.convert.from_keras, both with a dynamic batch dimension.
+    """
+    try:
+        tf2onnx = importlib.import_module('tf2onnx')
+    except ImportError:
+        raise ImportError("Exporting Keras models to ONNX requires tf2onnx (pip install tf2onnx)")
+    model = loader.model
+
+    os.makedirs(path, exist_ok = True)
+    onnx_path = os.path.join(path, MODEL_FILE)
+    export_model = getattr(model, 'export', None)
+    if export_model is not None and 'format' in inspect.signature(export_model).parameters:
+        # Keras 3
+        export_model(onnx_path, format = 'onnx', opset_version = opset)
+    else:
+        signature = [tf.TensorSpec((None,) + tuple(tensor.shape[1:]), tensor.dtype, name = 'input_{}'.format(i))
+                     for i, tensor in enumerate(model.inputs)]
+        tf2onnx.convert.from_keras(model, input_signature = signature, opset = opset, output_path = onnx_path)
+    _set_metadata(onnx_path, task = 'keras')
+    return onnx_path
+
+
+def export(loader, path, opset = 14):
+    """
+    Exports the model of 'loader' to ONNX in the folder 'path', to be loaded with ModelFromOnnx(path=path)
+
+    Parameters
+    ----------
+    loader : ModelFromTransformerForClassification, ModelFromTransformerWithLMHead or ModelFromH5
+        loader of the model, loaded if it is not yet
+    path : str
+        folder the model (and the tokenizer of transformer models) is exported to
+    opset : int
+        ONNX opset version of the exported graph
+
+    Returns
+    -------
+    onnx_path : str
+        path of the exported .onnx file
+    """
+    with metrics.phase('export', loader = type(loader).__name__):
+        if isinstance(loader, (ModelFromTransformerForClassification, ModelFromTransformerWithLMHead)):
+            return export_transformer(loader, path, opset)
+        if isinstance(loader, ModelFromH5):
+            return export_keras(loader, path, opset)
+    raise TypeError("Cannot export {} to ONNX".format(type(loader).__name__))
+
+
+class ModelFromOnnx(LazyLoader):
+    """
+    A class for managing downloading and loading of models exported to ONNX
+
+    The model runs through onnxruntime's CPU execution provider, so neither torch nor TensorFlow is
+    imported. onnxruntime optimizes the graph (constant folding, node fusions, layout changes) when
+    the session is created. Models exported from transformer loaders are loaded with their tokenizer.
+
+    Parameters
+    ----------
+    output : str
+        path of the exported model (its folder or the .onnx file) inside the downloaded archive (by default 'model.onnx')
+    path : str
+        local folder or .onnx file written by export(), loaded instead of downloading the model (by default None)
+    keep_archive : bool
+        keep the downloaded zip in the cache after extracting it (by default True)
+    lazy : bool
+        defer downloading and loading the model until it is first used (by default False)
+    num_threads : int
+        number of intra-op threads of onnxruntime (onnxruntime's default if None)
+    optimization : str
+        graph optimization level, one of 'disable', 'basic', 'extended' and 'all' (by default 'all')
+    config : str or dict
+        model zoo name, path to a result.json or a folder containing one (by default the result.json of the working directory)
+    offline : bool
+        only load the model from the local cache and fail fast if it is missing (by default $FOREST_OFFLINE)
+
+    Attributes
+    ----------
+    session : onnxruntime.InferenceSession
+        the loaded model
+    tokenizer
+        the tokenizer of models exported from transformer loaders, None otherwise
+    task : str
+        'classification', 'lm' or 'keras', the loader the model was exported from
+
+    Methods
+    -------
+    predict(inputs, batch_size=32)
+        returns the label (classification) or logits (lm) of a sentence, or the predictions for an array of inputs (keras)
+    predict_batch(texts, batch_size=32, max_length=128)
+        returns the labels and scores (classification) or the logits (lm) of a list of sentences, computed in padded batches
+    """
+
+    def __init__(self, output = MODEL_FILE, path = None, keep_archive = True, lazy = False, num_threads = None,
+                 optimization = 'all', config = 'result.json', offline = None):
+        super().__init__()
+
+        if optimization not in OPTIMIZATION_LEVELS:
+            raise ValueError("optimization must be one of {}, not {!r}".format(', '.join(OPTIMIZATION_LEVELS), optimization))
+        self.base_url = 'https://drive.google.com/uc?id='
+        self.path = path
+        if path is None:
+            with metrics.phase('resolve', loader = type(self).__name__):
+                config = resolve.resolve_config(config, offline = offline)
+            self.url_id = self._get_complete_url(config["Link"])
+            self.file_id = cache.get_file_id(config["Link"])
+            self.size, self.checksum = verify.expected(config, 'model.zip')
+            self.output = output
+        else:
+            self.url_id = self.file_id = self.size = self.checksum = None
+            self.output = os.path.abspath(path)
+        self.zip = 'model.zip'
+        self.keep_archive = keep_archive
+        self.offline = offline
+        self.num_threads = num_threads
+        self.optimization = optimization
+        self._setup_loading(lazy)
+
+    @property
+    def session(self):
+        return self._get_loaded()[0]
+
+    @property
+    def model(self):
+        return self.session
+
+    @property
+    def tokenizer(self):
+        return self._get_loaded()[1]
+
+    @property
+    def task(self):
+        return self._get_loaded()[2].get('task')
+
+    def _get_complete_url(self, url):
+        split_url = url.split('/')
+        return self.base_url + split_url[5]
+
+    def _session_options(self):
+        options = ort.SessionOptions()
+        options.graph_optimization_level = getattr(ort.GraphOptimizationLevel, OPTIMIZATION_LEVELS[self.optimization])
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        return options
+
+    def _load_model(self, force_download = False):
+        """
+        Returns the onnxruntime session, the tokenizer and the export metadata of the model if it is
+        loaded successfully, otherwise prints an error message
+        """
+        try:
+            path = self.path
+            if path is None:
+                target = cache.fetch_extracted(self.url_id, self.file_id, self.zip, checksum = self.checksum,
+                                               force_download = force_download, keep_archive = self.keep_archive,
+                                               offline = self.offline, size = self.size)
+                path = os.path.join(target, self.output)
+            onnx_path = os.path.join(path, MODEL_FILE) if os.path.isdir(path) else path
+            with metrics.phase('deserialize', loader = type(self).__name__):
+                session = ort.InferenceSession(onnx_path, self._session_options(), providers = ['CPUExecutionProvider'])
+                metadata = json.loads(session.get_modelmeta().custom_metadata_map.get(METADATA_KEY, '{}'))
+                tokenizer = None
+                if metadata.get('task') in ('classification', 'lm'):
+                    tokenizer = _load_tokenizer(os.path.dirname(os.path.abspath(onnx_path)))
+            return session, tokenizer, metadata
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
+        except:
+            print("[ERROR]:Error in loading model, please check downloaded file")
+            raise
+
+    def _run(self, batch):
+        """
+        Runs the model on a dict of numpy arrays and returns its first output
+        """
+        names = [node.name for node in self.session.get_inputs()]
+        return self.session.run(None, {name: batch[name].astype(np.int64) for name in names})[0]
+
+    @metrics.first_predict
+    def predict(self, inputs, batch_size = 32):
+        """
+        Returns the predictions of the model, like the predict() of the loader it was exported from.
+
+        Parameter
+        ---------
+            inputs : A sentence for models exported from transformer loaders, a numpy array with one input per row for Keras models.
+            batch_size : Number of inputs per batch (Keras models only).
+
+        Returns
+        -------
+            the predicted label (classification), the logits of shape (tokens, vocabulary size) (lm) or
+            a numpy array with one prediction per row of 'inputs' (keras)
+        """
+        if self.task in ('classification', 'lm'):
+            result = self.predict_batch([inputs])
+            return result[0][0] if self.task == 'classification' else result[0]
+        if self.result_cache is None or len(inputs) == 0:
+            return self._predict_rows(np.asarray(inputs), batch_size)
+        rows = self._memoized('predict', list(np.asarray(inputs)),
+                              lambda misses: list(self._predict_rows(np.stack(misses), batch_size)))
+        return np.stack(rows)
+
+    def _predict_rows(self, inputs, batch_size):
+        node = self.session.get_inputs()[0]
+        inputs = inputs.astype(np.float32) if node.type == 'tensor(float)' else inputs
+        outputs = [self.session.run(None, {node.name: inputs[start:start + batch_size]})[0]
+                   for start in range(0, len(inputs), batch_size)]
+        if outputs:
+            return np.concatenate(outputs)
+        shape = self.session.get_outputs()[0].shape[1:]
+        return np.empty((0,) + tuple(dim if isinstance(dim, int) else 0 for dim in shape), dtype = np.float32)
+
+    @metrics.first_predict
+    def predict_batch(self, texts, batch_size = 32, max_length = 128):
+        """
+        Returns the predictions of the model for a list of sentences, like the predict_batch() of the loader it was exported from.
+
+        Parameter
+        ---------
+            texts : List of sentences.
+            batch_size : Number of sentences passed through the model at once.
+            max_length : Sentences longer than this many tokens are truncated.
+
+        Returns
+        -------
+            labels, scores : numpy arrays of the predicted labels and their probabilities (classification)
+            logits : list with one numpy array of shape (tokens, vocabulary size) per sentence (lm)
+        """
+        texts = list(texts)
+        if self.task == 'lm':
+            return self._memoized('predict_batch', texts, lambda misses: self._lm_logits(misses, batch_size, max_length),
+                                  max_length = max_length)
+        if self.task != 'classification':
+            raise TypeError("predict_batch takes sentences, use predict() for {} models".format(self.task))
+        if self.result_cache is None:
+            return self._classify(texts, batch_size, max_length)
+        results = self._memoized('predict_batch', texts, lambda misses: list(zip(*self._classify(misses, batch_size, max_length))),
+                                 max_length = max_length)
+        labels = np.empty(len(texts), dtype = object)
+        labels[:] = [label for label, _ in results]
+        return labels, np.array([score for _, score in results], dtype = np.float32)
+
+    def _classify(self, texts, batch_size, max_length):
+        labels = np.empty(len(texts), dtype = object)
+        scores = np.empty(len(texts), dtype = np.float32)
+        id2label = self._get_loaded()[2]['id2label']
+
+        for index, batch in _padded_batches(self.tokenizer, texts, batch_size, max_length, None, return_tensors = 'np'):
+            probs = _softmax(self._run(batch))
+            scores[index] = probs.max(axis = -1)
+            labels[index] = [id2label[str(i)] for i in probs.argmax(axis = -1).tolist()]
+        return labels, scores
+
+    def _lm_logits(self, texts, batch_size, max_length):
+        logits = [None] * len(texts)
+
+        for index, batch in _padded_batches(self.tokenizer, texts, batch_size, max_length, None, return_tensors = 'np'):
+            output = self._run(batch)
+            for row, (i, length) in enumerate(zip(index, batch['attention_mask'].sum(axis = 1).tolist())):
+                logits[i] = output[row, :length]
+        return logits
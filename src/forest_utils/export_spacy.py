@@ -1,11 +1,16 @@
 import os
-import json
-import gdown
-import spacy
-import zipfile
 
+from .utils import cache
+from .utils import metrics
+from .utils import resolve
+from .utils import verify
+from .loading import LazyLoader
+from .utils.imports import lazy_import
 
-class ModelFromSpacy(object):
+spacy = lazy_import('spacy')
+
+
+class ModelFromSpacy(LazyLoader):
     """
     A class for managing downloading and loading of spaCy models.
 
@@ -16,9 +21,17 @@ class ModelFromSpacy(object):
     url_id : str
         The complete url to the required spaCy model.
     output : str
-        Relative path to the output file for the downloaded model.
+        Path of the model inside the extracted archive.
     zip : str
-        Path to the zip file (by default it is 'model.zip').
+        Name of the zip file in the model cache (by default it is 'model.zip').
+    keep_archive : bool
+        Whether the zip file is kept in the model cache after extraction.
+    disable : list
+        Names of the pipeline components that are disabled when the model is loaded.
+    exclude : list
+        Names of the pipeline components that are not loaded at all (and left out of the snapshot).
+    snapshot : bool
+        Whether the loaded pipeline is saved next to the extracted model and loaded from there later.
     
     Methods
     -------
@@ -26,24 +39,43 @@ class ModelFromSpacy(object):
         Returns the complete url to the required spaCy Model.
     _load_model():
         Downloads the model from the url to the output route and loads the model if successful, otherwise returns an error.
+    process(texts, batch_size=1000, n_process=1, disable=()):
+        Streams the processed documents of an iterable of texts, batched through nlp.pipe.
 
     """
-    def __init__(self, output):
+    def __init__(self, output, keep_archive = True, lazy = False, disable = (), exclude = (), snapshot = False,
+                 config = 'result.json', offline = None):
         """
         Constructs all the necessary attributes for the ModelFromSpacy Object.
 
         Parameter
         ----------
-            output: Path to the 'output' file for saving the downloaded model.
+            output: Path of the model inside the downloaded archive.
+            keep_archive: Keep the downloaded zip in the cache after extracting it (set to False to save disk space).
+            lazy: Defer downloading and loading the model until it is first used.
+            disable: Names of pipeline components (e.g. 'parser', 'ner') to disable when loading the model.
+            exclude: Names of pipeline components not to load at all.
+            snapshot: Save the loaded pipeline without the excluded components next to the extracted model and load that snapshot later.
+            config: Model zoo name, path to a result.json or a folder containing one (the result.json of the working directory by default).
+            offline: Only load the model from the local cache and fail fast if it is missing ($FOREST_OFFLINE by default).
 
         """
         super().__init__()
         
         self.base_url = 'https://drive.google.com/uc?id='
-        self.url_id = self._get_complete_url(json.load(open('result.json','r'))["Link"])
+        with metrics.phase('resolve', loader = type(self).__name__):
+            config = resolve.resolve_config(config, offline = offline)
+        self.url_id = self._get_complete_url(config["Link"])
+        self.file_id = cache.get_file_id(config["Link"])
+        self.size, self.checksum = verify.expected(config, 'model.zip')
         self.output = output
         self.zip = 'model.zip'
-        self.model = self._load_model()
+        self.keep_archive = keep_archive
+        self.disable = list(disable)
+        self.exclude = list(exclude)
+        self.snapshot = snapshot
+        self.offline = offline
+        self._setup_loading(lazy)
         
     def _get_complete_url(self, url):
         """
@@ -64,11 +96,71 @@ class ModelFromSpacy(object):
         """
 
         try:
-            if(not os.path.exists(self.zip) or force_download):
-                gdown.download(self.url_id, self.zip, quiet = False)
-            if not os.path.exists(self.output):
-                with zipfile.ZipFile(self.zip, 'r') as zip_ref:
-                    zip_ref.extractall()
-            return spacy.load(self.output)
+            target = cache.fetch_extracted(self.url_id, self.file_id, self.zip, checksum = self.checksum,
+                                           force_download = force_download, keep_archive = self.keep_archive,
+                                           offline = self.offline, size = self.size)
+            path = os.path.join(target, self.output)
+            # one snapshot per set of excluded components
+            snapshot = path.rstrip('/\\') + '.snapshot' + ''.join('-' + name for name in sorted(self.exclude))
+            with metrics.phase('deserialize', loader = type(self).__name__):
+                if self.snapshot and os.path.isdir(snapshot):
+                    return spacy.load(snapshot, disable = self.disable)
+                nlp = self._load_pipeline(path)
+            if self.snapshot:
+                self._write_snapshot(nlp, snapshot)
+            return nlp
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
         except:
             print("[ERROR]:Error in loading model, please check downloaded file")
+            raise
+
+    def _load_pipeline(self, path):
+        """
+        Loads the pipeline at 'path' without the excluded components.
+
+        spaCy 3 has separate 'exclude' (not loaded) and 'disable' (loaded but not run) options, while
+        spaCy 2 never loads the components it is asked to disable.
+        """
+        if int(spacy.__version__.split('.')[0]) >= 3:
+            return spacy.load(path, disable = self.disable, exclude = self.exclude)
+        return spacy.load(path, disable = self.disable + self.exclude)
+
+    def _write_snapshot(self, nlp, snapshot):
+        """
+        Saves the loaded pipeline to 'snapshot' with nlp.to_disk, unless another worker already did.
+        """
+        if os.path.isdir(snapshot):
+            return
+        tmp = snapshot + '.tmp'
+        nlp.to_disk(tmp)
+        try:
+            os.replace(tmp, snapshot)
+        except OSError:
+            pass
+
+    @metrics.first_predict
+    def process(self, texts, batch_size = 1000, n_process = 1, disable = ()):
+        """
+        Yields the processed spaCy Doc of every text, running the texts through nlp.pipe in batches.
+
+        Parameter
+        ---------
+            texts : Iterable of texts, consumed lazily so large corpora can be streamed.
+            batch_size : Number of texts buffered and processed together.
+            n_process : Number of worker processes (-1 to use all cores).
+            disable : Names of pipeline components to skip for this call only.
+
+        """
+        nlp = self.model
+        kwargs = {'batch_size': batch_size}
+        # passed to nlp.pipe rather than toggled on the pipeline, which is shared with other callers
+        # while this generator is paused
+        disabled = [name for name in disable if name in nlp.pipe_names]
+        if disabled:
+            kwargs['disable'] = disabled
+        if n_process != 1:
+            kwargs['n_process'] = n_process
+        for doc in nlp.pipe(texts, **kwargs):
+            yield doc
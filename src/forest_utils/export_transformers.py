@@ -1,12 +1,189 @@
 import os
-import json
-import gdown
-import torch
-import zipfile
-import transformers
 
+from .utils import cache
+from .utils import metrics
+from .utils import resolve
+from .utils import verify
+from .loading import LazyLoader
+from .utils.imports import lazy_import
 
-class ModelFromTransformerWithLMHead(object):
+np = lazy_import('numpy')
+torch = lazy_import('torch')
+transformers = lazy_import('transformers')
+
+
+def _inference_mode():
+    """
+    Returns torch.inference_mode() where available (torch >= 1.9), torch.no_grad() otherwise
+    """
+    return getattr(torch, 'inference_mode', torch.no_grad)()
+
+
+def _set_threads(num_threads = None, interop_threads = None):
+    """
+    Sets the number of threads torch uses within (intra-op) and across (inter-op) operators.
+
+    torch only accepts the inter-op thread count before it runs its first parallel operation,
+    later calls keep the current setting.
+    """
+    if num_threads:
+        torch.set_num_threads(num_threads)
+    if interop_threads and torch.get_num_interop_threads() != interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            print("[WARNING]:Inter-op threads can only be set before torch runs in parallel, keeping {}".format(torch.get_num_interop_threads()))
+
+
+def _quantized_skeleton(model):
+    """
+    Swaps every Linear layer of 'model' for an empty dynamically quantized one, so that a saved
+    quantized state dict can be loaded into it without quantizing the fp32 weights again.
+    """
+    for module in list(model.modules()):
+        for name, child in list(module.named_children()):
+            if type(child) is torch.nn.Linear:
+                setattr(module, name, torch.nn.quantized.dynamic.Linear(child.in_features, child.out_features,
+                                                                         bias_ = child.bias is not None, dtype = torch.qint8))
+    return model.eval()
+
+
+def _load_transformer(auto_class, path, device, cpu_optimize = False, cache_quantized = True):
+    """
+    Loads the model at 'path' with 'auto_class', optionally quantized for CPU inference.
+
+    With 'cpu_optimize' the Linear layers are dynamically quantized to int8. If 'cache_quantized' is
+    set the quantized weights are saved next to the extracted model, and later loads build the
+    quantized model from its config and those weights instead of loading and quantizing the fp32 ones.
+    """
+    if not cpu_optimize:
+        return auto_class.from_pretrained(path).to(device)
+
+    quantized_path = path.rstrip('/\\') + '.quantized.pt'
+    if cache_quantized and os.path.exists(quantized_path):
+        model = _quantized_skeleton(auto_class.from_config(transformers.AutoConfig.from_pretrained(path)))
+        model.load_state_dict(torch.load(quantized_path, map_location = 'cpu'))
+        return model
+    model = torch.quantization.quantize_dynamic(auto_class.from_pretrained(path), {torch.nn.Linear}, dtype = torch.qint8)
+    if cache_quantized:
+        torch.save(model.state_dict(), quantized_path + '.tmp')
+        os.replace(quantized_path + '.tmp', quantized_path)
+    return model
+
+
+def _lm_auto_class(path):
+    """
+    Returns the transformers auto class of the language model at 'path'.
+
+    AutoModelWithLMHead was removed in transformers 5, there masked language models (BERT-like)
+    are loaded with AutoModelForMaskedLM and all others with AutoModelForCausalLM.
+    """
+    auto_class = getattr(transformers, 'AutoModelWithLMHead', None)
+    if auto_class is not None:
+        return auto_class
+    if type(transformers.AutoConfig.from_pretrained(path)) in transformers.MODEL_FOR_MASKED_LM_MAPPING:
+        return transformers.AutoModelForMaskedLM
+    return transformers.AutoModelForCausalLM
+
+
+def _snapshot_path(path):
+    """
+    Returns the directory the safetensors snapshot of the model at 'path' is kept in
+    """
+    if os.path.exists(os.path.join(path, 'model.safetensors')):
+        return path
+    return path.rstrip('/\\') + '.snapshot'
+
+
+def _write_snapshot(model, tokenizer, snapshot):
+    """
+    Saves 'model' with safetensors weights and its tokenizer to 'snapshot', unless it already exists.
+
+    Later loads from the snapshot memory-map the weights, so worker processes on one host share
+    the same pages instead of each reading its own copy.
+    """
+    if os.path.isdir(snapshot):
+        return
+    tmp = snapshot + '.tmp'
+    model.save_pretrained(tmp, safe_serialization = True)
+    tokenizer.save_pretrained(tmp)
+    try:
+        os.replace(tmp, snapshot)
+    except OSError:
+        # another worker wrote the snapshot first
+        pass
+
+
+def _quantization_delta(reference, quantized, tokenizer, texts, batch_size, max_length):
+    """
+    Compares the output probabilities of an fp32 model and its quantized copy on 'texts'.
+
+    Returns the largest absolute difference of any probability and the share of predictions
+    (per sentence for classifiers, per token for language models) whose top-1 class is the same.
+    """
+    max_abs_diff, agreeing, total = 0.0, 0, 0
+    with _inference_mode():
+        for _, batch in _padded_batches(tokenizer, list(texts), batch_size, max_length, 'cpu'):
+            expected = torch.softmax(reference(**batch)[0].float(), dim = -1)
+            actual = torch.softmax(quantized(**batch)[0].float(), dim = -1)
+            if expected.dim() == 3:
+                mask = batch['attention_mask'].bool()
+                expected, actual = expected[mask], actual[mask]
+            max_abs_diff = max(max_abs_diff, (expected - actual).abs().max().item())
+            agreeing += (expected.argmax(dim = -1) == actual.argmax(dim = -1)).sum().item()
+            total += expected.shape[0]
+    return {'max_abs_diff': max_abs_diff, 'top1_agreement': agreeing / total if total else 1.0}
+
+
+def _padded_batches(tokenizer, texts, batch_size, max_length, device, return_tensors = 'pt'):
+    """
+    Tokenizes all 'texts' in one call and yields (indices, batch) pairs of at most 'batch_size' sentences.
+
+    Sentences are sorted by token length, so each batch is padded only up to its own longest sentence.
+    'indices' are the positions of the batch's sentences in 'texts'. With return_tensors='np' the
+    batches are numpy arrays and 'device' is ignored.
+    """
+    if not texts:
+        return
+    encoded = tokenizer(texts, truncation = True, max_length = max_length)['input_ids']
+    yield from _pad_encoded(tokenizer, encoded, batch_size, device, return_tensors)
+
+
+def _pad_encoded(tokenizer, encoded, batch_size, device, return_tensors = 'pt'):
+    """
+    Yields (indices, batch) pairs of at most 'batch_size' of the token id lists 'encoded', shortest first,
+    each batch padded up to its own longest sequence.
+    """
+    order = sorted(range(len(encoded)), key = lambda i: len(encoded[i]))
+    for start in range(0, len(order), batch_size):
+        index = order[start:start + batch_size]
+        batch = tokenizer.pad({'input_ids': [encoded[i] for i in index]}, return_tensors = return_tensors)
+        if return_tensors == 'pt':
+            yield index, {key: value.to(device) for key, value in batch.items()}
+        else:
+            yield index, dict(batch)
+
+
+def _sliding_windows(tokenizer, texts, window, stride):
+    """
+    Splits the tokens of every text into windows of at most 'window' tokens (special tokens included),
+    consecutive windows of a text overlapping by 'stride' tokens.
+
+    Returns the token ids of all windows and, for every window, the index of its text in 'texts'.
+    The windows are cut by the fast (Rust) tokenizer while tokenizing, as its overflowing tokens.
+    """
+    size = window - tokenizer.num_special_tokens_to_add()
+    if not 0 <= stride < size:
+        raise ValueError("stride must be at least 0 and smaller than the {} tokens of a window without its special tokens".format(size))
+    if not texts:
+        return [], []
+    encoded = tokenizer(texts, truncation = True, max_length = window, stride = stride, return_overflowing_tokens = True)
+    if 'overflow_to_sample_mapping' not in encoded:
+        raise ValueError("Sliding windows need a fast tokenizer, {} is not one".format(type(tokenizer).__name__))
+    return encoded['input_ids'], list(encoded['overflow_to_sample_mapping'])
+
+
+class ModelFromTransformerWithLMHead(LazyLoader):
     """
     A class for managing downloading and loading of transformer language model.
 
@@ -17,9 +194,11 @@ class ModelFromTransformerWithLMHead(object):
     url_id : str
         The complete url to the required transformer language model.
     output : str
-        Relative path to the output file for the downloaded model.
+        Path of the model inside the extracted archive.
     zip : str
-        Path to the zip file (by default it is 'model.zip').
+        Name of the zip file in the model cache (by default it is 'model.zip').
+    keep_archive : bool
+        Whether the zip file is kept in the model cache after extraction.
     
     Methods
     -------
@@ -27,25 +206,63 @@ class ModelFromTransformerWithLMHead(object):
         Returns the complete url to the required transformers language model.
     _load_model():
         Downloads the model from the url to the output route and loads the model if successful, otherwise returns an error.
+    _get_pipeline(task):
+        Returns the cached transformers pipeline for the given task, building it on first use.
+    quantization_delta(texts, batch_size=32, max_length=128):
+        Compares the quantized model with the fp32 model on a list of sentences.
+    predict_batch(texts, batch_size=32, max_length=128):
+        Returns the language model logits of a list of sentences, computed in padded batches.
+    embed(texts, batch_size=32, max_length=128, pooling='mean'):
+        Returns pooled last hidden states of a list of sentences as a contiguous numpy array.
 
     """
-    def __init__(self, output):
+    def __init__(self, output, keep_archive = True, lazy = False, cpu_optimize = False, num_threads = None,
+                 interop_threads = None, cache_quantized = True, snapshot = False, config = 'result.json', offline = None):
         """
         Constructs all the necessary attributes for the ModelFromTransformerWithLMHead Object.
 
         Parameter
         ----------
-            output: Path to the 'output' file for saving the downloaded model.
+            output: Path of the model inside the downloaded archive.
+            keep_archive: Keep the downloaded zip in the cache after extracting it (set to False to save disk space).
+            lazy: Defer downloading and loading the model until it is first used.
+            cpu_optimize: Load the model on the CPU with its Linear layers dynamically quantized to int8.
+            num_threads: Number of intra-op threads torch uses (torch's default if None).
+            interop_threads: Number of inter-op threads torch uses (torch's default if None).
+            cache_quantized: Save the quantized model next to the extracted one so later loads skip quantizing.
+            snapshot: Save the loaded model with memory-mappable safetensors weights next to the extracted one and load from that snapshot later.
+            config: Model zoo name, path to a result.json or a folder containing one (the result.json of the working directory by default).
+            offline: Only load the model from the local cache and fail fast if it is missing ($FOREST_OFFLINE by default).
 
         """
         super().__init__()
         
         self.base_url = 'https://drive.google.com/uc?id='
-        self.url_id = self._get_complete_url(json.load(open('result.json','r'))["Link"])
+        with metrics.phase('resolve', loader = type(self).__name__):
+            config = resolve.resolve_config(config, offline = offline)
+        self.url_id = self._get_complete_url(config["Link"])
+        self.file_id = cache.get_file_id(config["Link"])
+        self.size, self.checksum = verify.expected(config, 'model.zip')
         self.output = output
         self.zip = 'model.zip'
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.tokenizer, self.model = self._load_model()
+        self.keep_archive = keep_archive
+        self.offline = offline
+        self.cpu_optimize = cpu_optimize
+        self.cache_quantized = cache_quantized
+        self.snapshot = snapshot
+        self.model_path = None
+        self.device = "cuda" if torch.cuda.is_available() and not cpu_optimize else "cpu"
+        _set_threads(num_threads, interop_threads)
+        self._pipelines = {}
+        self._setup_loading(lazy)
+
+    @property
+    def tokenizer(self):
+        return self._get_loaded()[0]
+
+    @property
+    def model(self):
+        return self._get_loaded()[1]
         
     def _get_complete_url(self, url):
         """
@@ -66,28 +283,143 @@ class ModelFromTransformerWithLMHead(object):
         """
 
         try:
-            if(not os.path.exists(self.zip) or force_download):
-                gdown.download(self.url_id, self.zip, quiet = False)
-            if not os.path.exists(self.output):
-                with zipfile.ZipFile(self.zip, 'r') as zip_ref:
-                    zip_ref.extractall()
-            return transformers.AutoTokenizer.from_pretrained(self.output), transformers.AutoModelWithLMHead.from_pretrained(self.output).to(self.device)
+            target = cache.fetch_extracted(self.url_id, self.file_id, self.zip, checksum = self.checksum,
+                                           force_download = force_download, keep_archive = self.keep_archive,
+                                           offline = self.offline, size = self.size)
+            path = os.path.join(target, self.output)
+            snapshot = _snapshot_path(path)
+            if self.snapshot and os.path.isdir(snapshot):
+                path = snapshot
+            self.model_path = path
+            with metrics.phase('deserialize', loader = type(self).__name__):
+                tokenizer = transformers.AutoTokenizer.from_pretrained(path)
+                model = _load_transformer(_lm_auto_class(path), path, self.device, self.cpu_optimize, self.cache_quantized)
+            if self.snapshot and not self.cpu_optimize:
+                _write_snapshot(model, tokenizer, snapshot)
+            return tokenizer, model
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
         except:
             print("[ERROR]:Error in loading model, please check downloaded file")
-            
+            raise
+
+    def quantization_delta(self, texts, batch_size = 32, max_length = 128):
+        """
+        Returns how far the quantized model (cpu_optimize=True) drifts from the fp32 model on 'texts'.
+
+        Returns
+        -------
+            delta : dict with 'max_abs_diff', the largest difference of any output probability, and
+                    'top1_agreement', the share of top-1 predictions that are the same in both models.
+        """
+        reference = _lm_auto_class(self.model_path).from_pretrained(self.model_path)
+        return _quantization_delta(reference, self.model, self.tokenizer, texts, batch_size, max_length)
+
+    def _get_pipeline(self, task):
+        """
+        Returns the transformers pipeline for 'task', building it on first use.
+
+        The pipeline runs on the same device the model was loaded on, so the weights are never moved between calls.
+
+        Parameter
+        ---------
+            task : Name of the transformers pipeline task, e.g. 'fill-mask'.
+
+        """
+        if task not in self._pipelines:
+            self._pipelines[task] = transformers.pipeline(task, model = self.model, tokenizer = self.tokenizer,
+                                                          device = 0 if self.device == "cuda" else -1)
+        return self._pipelines[task]
+
+    @metrics.first_predict
     def predict(self, sentence):
         
+        return self._memoized('predict', [sentence], lambda sentences: [self._predict(sentences[0])])[0]
+
+    def _predict(self, sentence):
+
         with torch.no_grad():
             vector = self.model(torch.tensor(self.tokenizer.encode(sentence, add_special_tokens = True)).to(self.device).unsqueeze(0))
         return vector
     
+    @metrics.first_predict
+    def predict_batch(self, texts, batch_size = 32, max_length = 128):
+        """
+        Returns the language model logits of every sentence in 'texts'.
+
+        Parameter
+        ---------
+            texts : List of sentences.
+            batch_size : Number of sentences passed through the model at once.
+            max_length : Sentences longer than this many tokens are truncated.
+
+        Returns
+        -------
+            logits : list with one numpy array of shape (tokens, vocabulary size) per sentence, in the order of 'texts'.
+        """
+        return self._memoized('predict_batch', list(texts), lambda misses: self._predict_batch(misses, batch_size, max_length),
+                              max_length = max_length)
+
+    def _predict_batch(self, texts, batch_size, max_length):
+        logits = [None] * len(texts)
+
+        with _inference_mode():
+            for index, batch in _padded_batches(self.tokenizer, texts, batch_size, max_length, self.device):
+                output = self.model(**batch)[0].cpu().numpy()
+                lengths = batch['attention_mask'].sum(dim = 1).tolist()
+                for row, (i, length) in enumerate(zip(index, lengths)):
+                    logits[i] = output[row, :length]
+        return logits
+
+    @metrics.first_predict
+    def embed(self, texts, batch_size = 32, max_length = 128, pooling = 'mean'):
+        """
+        Returns one embedding per sentence pooled from the last hidden layer, e.g. for similarity indexes.
+
+        Parameter
+        ---------
+            texts : List of sentences.
+            batch_size : Number of sentences passed through the model at once.
+            max_length : Sentences longer than this many tokens are truncated.
+            pooling : 'mean' to average the hidden states of all tokens, 'cls' to take the first token's.
+
+        Returns
+        -------
+            embeddings : contiguous float32 numpy array of shape (len(texts), hidden size).
+        """
+        if pooling not in ('mean', 'cls'):
+            raise ValueError("pooling must be 'mean' or 'cls', not {!r}".format(pooling))
+        texts = list(texts)
+        if self.result_cache is None:
+            return self._embed(texts, batch_size, max_length, pooling)
+        rows = self._memoized('embed', texts, lambda misses: self._embed(misses, batch_size, max_length, pooling),
+                              max_length = max_length, pooling = pooling)
+        return np.stack(rows) if rows else np.empty((0, self.model.config.hidden_size), dtype = np.float32)
+
+    def _embed(self, texts, batch_size, max_length, pooling):
+        embeddings = np.empty((len(texts), self.model.config.hidden_size), dtype = np.float32)
+
+        with _inference_mode():
+            for index, batch in _padded_batches(self.tokenizer, texts, batch_size, max_length, self.device):
+                hidden = self.model(**batch, output_hidden_states = True)[-1][-1]
+                if pooling == 'cls':
+                    pooled = hidden[:, 0]
+                else:
+                    mask = batch['attention_mask'].unsqueeze(-1).to(hidden.dtype)
+                    pooled = (hidden * mask).sum(dim = 1) / mask.sum(dim = 1)
+                embeddings[index] = pooled.float().cpu().numpy()
+        return embeddings
+
+    @metrics.first_predict
     def fill_mask(self, sentence):
         
-        nlp_fill = transformers.pipeline('fill-mask', model = self.model.to('cpu'), tokenizer = self.tokenizer)
-        return nlp_fill(sentence + nlp_fill.tokenizer.mask_token)
+        nlp_fill = self._get_pipeline('fill-mask')
+        return self._memoized('fill_mask', [sentence],
+                              lambda sentences: [nlp_fill(sentences[0] + nlp_fill.tokenizer.mask_token)])[0]
     
 
-class ModelFromTransformerForClassification(object):
+class ModelFromTransformerForClassification(LazyLoader):
     """
     A class for managing downloading and loading of transformer model for classification.
 
@@ -98,9 +430,11 @@ class ModelFromTransformerForClassification(object):
     url_id : str
         The complete url to the required transformer model for classification.
     output : str
-        Relative path to the output file for the downloaded model.
+        Path of the model inside the extracted archive.
     zip : str
-        Path to the zip file (by default it is 'model.zip').
+        Name of the zip file in the model cache (by default it is 'model.zip').
+    keep_archive : bool
+        Whether the zip file is kept in the model cache after extraction.
     
     Methods
     -------
@@ -108,25 +442,65 @@ class ModelFromTransformerForClassification(object):
         Returns the complete url to the required transformer model for classification.
     _load_model():
         Downloads the model from the url to the output route and loads the model if successful, otherwise returns an error.
+    _get_pipeline(task):
+        Returns the cached transformers pipeline for the given task, building it on first use.
+    quantization_delta(texts, batch_size=32, max_length=128):
+        Compares the quantized model with the fp32 model on a list of sentences.
+    predict(sentence):
+        Returns the predicted label for a single sentence.
+    predict_batch(texts, batch_size=32, max_length=128):
+        Returns the predicted labels and scores for a list of sentences, classified in padded batches.
+    predict_long(texts, window=None, stride=128, batch_size=32):
+        Returns the predicted labels and scores for documents of any length, classified in overlapping token windows.
 
     """
-    def __init__(self, output):
+    def __init__(self, output, keep_archive = True, lazy = False, cpu_optimize = False, num_threads = None,
+                 interop_threads = None, cache_quantized = True, snapshot = False, config = 'result.json', offline = None):
         """
         Constructs all the necessary attributes for the ModelFromTransformerForClassification Object.
 
         Parameter
         ----------
-            output: Path to the 'output' file for saving the downloaded model.
+            output: Path of the model inside the downloaded archive.
+            keep_archive: Keep the downloaded zip in the cache after extracting it (set to False to save disk space).
+            lazy: Defer downloading and loading the model until it is first used.
+            cpu_optimize: Load the model on the CPU with its Linear layers dynamically quantized to int8.
+            num_threads: Number of intra-op threads torch uses (torch's default if None).
+            interop_threads: Number of inter-op threads torch uses (torch's default if None).
+            cache_quantized: Save the quantized model next to the extracted one so later loads skip quantizing.
+            snapshot: Save the loaded model with memory-mappable safetensors weights next to the extracted one and load from that snapshot later.
+            config: Model zoo name, path to a result.json or a folder containing one (the result.json of the working directory by default).
+            offline: Only load the model from the local cache and fail fast if it is missing ($FOREST_OFFLINE by default).
 
         """
         super().__init__()
         
         self.base_url = 'https://drive.google.com/uc?id='
-        self.url_id = self._get_complete_url(json.load(open('result.json','r'))["Link"])
+        with metrics.phase('resolve', loader = type(self).__name__):
+            config = resolve.resolve_config(config, offline = offline)
+        self.url_id = self._get_complete_url(config["Link"])
+        self.file_id = cache.get_file_id(config["Link"])
+        self.size, self.checksum = verify.expected(config, 'model.zip')
         self.output = output
         self.zip = 'model.zip'
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.tokenizer, self.model = self._load_model()
+        self.keep_archive = keep_archive
+        self.offline = offline
+        self.cpu_optimize = cpu_optimize
+        self.cache_quantized = cache_quantized
+        self.snapshot = snapshot
+        self.model_path = None
+        self.device = "cuda" if torch.cuda.is_available() and not cpu_optimize else "cpu"
+        _set_threads(num_threads, interop_threads)
+        self._pipelines = {}
+        self._setup_loading(lazy)
+
+    @property
+    def tokenizer(self):
+        return self._get_loaded()[0]
+
+    @property
+    def model(self):
+        return self._get_loaded()[1]
         
     def _get_complete_url(self, url):
         """
@@ -147,17 +521,150 @@ class ModelFromTransformerForClassification(object):
         """
 
         try:
-            if(not os.path.exists(self.zip) or force_download):
-                gdown.download(self.url_id, self.zip, quiet = False)
-            if not os.path.exists(self.output):
-                with zipfile.ZipFile(self.zip, 'r') as zip_ref:
-                    zip_ref.extractall()
-            return transformers.AutoTokenizer.from_pretrained(self.output), transformers.AutoModelForSequenceClassification.from_pretrained(self.output).to(self.device)
+            target = cache.fetch_extracted(self.url_id, self.file_id, self.zip, checksum = self.checksum,
+                                           force_download = force_download, keep_archive = self.keep_archive,
+                                           offline = self.offline, size = self.size)
+            path = os.path.join(target, self.output)
+            snapshot = _snapshot_path(path)
+            if self.snapshot and os.path.isdir(snapshot):
+                path = snapshot
+            self.model_path = path
+            with metrics.phase('deserialize', loader = type(self).__name__):
+                tokenizer = transformers.AutoTokenizer.from_pretrained(path)
+                model = _load_transformer(transformers.AutoModelForSequenceClassification, path, self.device, self.cpu_optimize, self.cache_quantized)
+            if self.snapshot and not self.cpu_optimize:
+                _write_snapshot(model, tokenizer, snapshot)
+            return tokenizer, model
+        except resolve.OfflineError:
+            # fail fast, there is no downloaded file to check
+            raise
         except:
             print("[ERROR]:Error in loading model, please check downloaded file")
-        
-    
+            raise
+
+    def quantization_delta(self, texts, batch_size = 32, max_length = 128):
+        """
+        Returns how far the quantized model (cpu_optimize=True) drifts from the fp32 model on 'texts'.
+
+        Returns
+        -------
+            delta : dict with 'max_abs_diff', the largest difference of any output probability, and
+                    'top1_agreement', the share of top-1 predictions that are the same in both models.
+        """
+        reference = transformers.AutoModelForSequenceClassification.from_pretrained(self.model_path)
+        return _quantization_delta(reference, self.model, self.tokenizer, texts, batch_size, max_length)
+
+    def _get_pipeline(self, task):
+        """
+        Returns the transformers pipeline for 'task', building it on first use.
+
+        The pipeline runs on the same device the model was loaded on, so the weights are never moved between calls.
+
+        Parameter
+        ---------
+            task : Name of the transformers pipeline task, e.g. 'fill-mask'.
+
+        """
+        if task not in self._pipelines:
+            self._pipelines[task] = transformers.pipeline(task, model = self.model, tokenizer = self.tokenizer,
+                                                          device = 0 if self.device == "cuda" else -1)
+        return self._pipelines[task]
+
+    @metrics.first_predict
     def predict(self, sentence):
         
-        nlp_classif = transformers.pipeline('sentiment-analysis', model = self.model.to('cpu'), tokenizer = self.tokenizer)
-        return nlp_classif(sentence)[0]['label']
\ No newline at end of file
+        nlp_classif = self._get_pipeline('sentiment-analysis')
+        return self._memoized('predict', [sentence], lambda sentences: [nlp_classif(sentences[0])[0]['label']])[0]
+
+    @metrics.first_predict
+    def predict_batch(self, texts, batch_size = 32, max_length = 128):
+        """
+        Returns the predicted labels and their scores for a list of sentences.
+
+        All sentences are tokenized in one call and sorted by token length, so each batch
+        is padded only up to its own longest sentence.
+
+        Parameter
+        ---------
+            texts : List of sentences to classify.
+            batch_size : Number of sentences passed through the model at once.
+            max_length : Sentences longer than this many tokens are truncated.
+
+        Returns
+        -------
+            labels : numpy array of predicted labels, in the same order as 'texts'.
+            scores : numpy array with the probability of each predicted label.
+        """
+        texts = list(texts)
+        if self.result_cache is None:
+            return self._predict_batch(texts, batch_size, max_length)
+        results = self._memoized('predict_batch', texts, lambda misses: list(zip(*self._predict_batch(misses, batch_size, max_length))),
+                                 max_length = max_length)
+        labels = np.empty(len(texts), dtype = object)
+        labels[:] = [label for label, _ in results]
+        return labels, np.array([score for _, score in results], dtype = np.float32)
+
+    def _predict_batch(self, texts, batch_size, max_length):
+        labels = np.empty(len(texts), dtype = object)
+        scores = np.empty(len(texts), dtype = np.float32)
+        id2label = self.model.config.id2label
+
+        with _inference_mode():
+            for index, batch in _padded_batches(self.tokenizer, texts, batch_size, max_length, self.device):
+                probs, ids = torch.softmax(self.model(**batch)[0], dim = -1).max(dim = -1)
+                scores[index] = probs.cpu().numpy()
+                labels[index] = [id2label[i] for i in ids.tolist()]
+        return labels, scores
+
+    @metrics.first_predict
+    def predict_long(self, texts, window = None, stride = 128, batch_size = 32):
+        """
+        Returns the predicted labels and their scores for documents longer than the model's input.
+
+        Every document is split into windows of at most 'window' tokens overlapping by 'stride'
+        tokens. The windows of all documents are classified together in batches of similar length,
+        and the logits of a document's windows are averaged, weighted by their number of tokens.
+        The cost grows linearly with the length of the documents.
+
+        Parameter
+        ---------
+            texts : List of documents to classify.
+            window : Tokens per window, special tokens included (the model's maximum input length by default).
+            stride : Number of tokens consecutive windows of a document share.
+            batch_size : Number of windows passed through the model at once.
+
+        Returns
+        -------
+            labels : numpy array of predicted labels, in the same order as 'texts'.
+            scores : numpy array with the probability of each predicted label.
+        """
+        texts = list(texts)
+        if window is None:
+            longest = self.tokenizer.model_max_length
+            window = min(longest, getattr(self.model.config, 'max_position_embeddings', longest))
+        if self.result_cache is None:
+            return self._predict_long(texts, window, stride, batch_size)
+        results = self._memoized('predict_long', texts, lambda misses: list(zip(*self._predict_long(misses, window, stride, batch_size))),
+                                 window = window, stride = stride)
+        labels = np.empty(len(texts), dtype = object)
+        labels[:] = [label for label, _ in results]
+        return labels, np.array([score for _, score in results], dtype = np.float32)
+
+    def _predict_long(self, texts, window, stride, batch_size):
+        windows, owners = _sliding_windows(self.tokenizer, texts, window, stride)
+        owners = np.asarray(owners, dtype = np.int64)
+        logits = np.zeros((len(texts), self.model.config.num_labels), dtype = np.float64)
+        weights = np.zeros(len(texts), dtype = np.float64)
+
+        with _inference_mode():
+            for index, batch in _pad_encoded(self.tokenizer, windows, batch_size, self.device):
+                lengths = batch['attention_mask'].sum(dim = 1).cpu().numpy()
+                output = self.model(**batch)[0].float().cpu().numpy()
+                np.add.at(logits, owners[index], output * lengths[:, None])
+                np.add.at(weights, owners[index], lengths)
+
+        id2label = self.model.config.id2label
+        probs, ids = torch.softmax(torch.from_numpy(logits / np.maximum(weights, 1)[:, None]), dim = -1).max(dim = -1)
+        labels = np.empty(len(texts), dtype = object)
+        labels[:] = [id2label[i] for i in ids.tolist()]
+        return labels, probs.numpy().astype(np.float32)
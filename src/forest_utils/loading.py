@@ -0,0 +1,149 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    Returns the thread pool shared by all background model loads, creating it on first use
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers = 4, thread_name_prefix = 'forest-load')
+        return _executor
+
+
+class LazyLoader(object):
+    """
+    Base class of the ModelFrom* loaders deferring the download and loading of the model.
+
+    Subclasses implement _load_model() and call _setup_loading(lazy) at the end of __init__. With
+    lazy set to False the model is loaded right away like before, otherwise it is loaded on first
+    access of 'model', on load(), or in the background through load_future() / load_async().
+
+    Attributes
+    ----------
+    model
+        the loaded model, loaded on first access
+    is_loaded : bool
+        whether the model has finished loading, e.g. for health checks
+
+    Methods
+    -------
+    load():
+        Loads the model in the calling thread if it is not loaded yet and returns the loader.
+    load_future(executor=None):
+        Starts loading in the background and returns a concurrent.futures.Future resolving to the loader.
+    load_async(executor=None):
+        Coroutine loading the model without blocking the event loop and returning the loader.
+    memoize(result_cache=None):
+        Enables memoization of the predictions for repeated inputs and returns the loader.
+    """
+
+    result_cache = None
+
+    def _setup_loading(self, lazy = False):
+        self._load_lock = threading.Lock()
+        self._future_lock = threading.Lock()
+        self._load_future = None
+        self._loaded = None
+        self._is_loaded = False
+        if not lazy:
+            self.load()
+
+    def _get_loaded(self):
+        if not self._is_loaded:
+            self.load()
+        return self._loaded
+
+    @property
+    def model(self):
+        return self._get_loaded()
+
+    @property
+    def is_loaded(self):
+        return self._is_loaded
+
+    def load(self):
+        """
+        Loads the model if it is not loaded yet, waiting for a load already running in another thread
+
+        Errors of the load are raised and the model stays not loaded, so a later call tries again.
+        """
+        with self._load_lock:
+            if not self._is_loaded:
+                loaded = self._load_model()
+                if loaded is None:
+                    raise RuntimeError("{} failed to load the model".format(type(self).__name__))
+                self._loaded = loaded
+                self._is_loaded = True
+        return self
+
+    def load_future(self, executor = None):
+        """
+        Returns a Future resolving to the loader once the model is loaded.
+
+        The load is started on 'executor' (the shared loader pool by default) the first time this is
+        called, later calls return the same Future. If the load failed, the Future raises its error
+        and the next call starts loading again.
+
+        Parameter
+        ---------
+            executor : concurrent.futures.Executor to load the model on.
+
+        """
+        with self._future_lock:
+            failed = self._load_future is not None and self._load_future.done() and self._load_future.exception() is not None
+            if self._load_future is None or failed:
+                self._load_future = (executor or get_executor()).submit(self.load)
+            return self._load_future
+
+    async def load_async(self, executor = None):
+        """
+        Loads the model in the background and returns the loader, so several models can be awaited together:
+
+            await asyncio.gather(ModelFromH5(lazy=True).load_async(), ModelFromSpacy('cord', lazy=True).load_async())
+
+        Parameter
+        ---------
+            executor : concurrent.futures.Executor to load the model on.
+
+        """
+        import asyncio
+
+        return await asyncio.wrap_future(self.load_future(executor))
+
+    def memoize(self, result_cache = None):
+        """
+        Memoizes the predictions of this model, so repeated inputs are answered without running the model:
+
+            model = ModelFromTransformerForClassification('model').memoize(ResultCache(path = 'results.sqlite'))
+
+        Batched predict methods only pass the inputs that are not cached on to the model. Pass None
+        as 'result_cache' for an in-memory cache of this model alone, or share one between models.
+
+        Parameter
+        ---------
+            result_cache : forest_utils.utils.memo.ResultCache keeping the results.
+
+        """
+        from .utils.memo import ResultCache
+
+        self.result_cache = result_cache if result_cache is not None else ResultCache()
+        return self
+
+    def _memoized(self, method, inputs, compute, **params):
+        """
+        Returns compute(inputs), taking the results of inputs seen before from the result cache (if enabled).
+
+        The results are keyed by the model (its class, file id, checksum, path inside the archive and
+        whether it is quantized), 'method', the 'params' changing the results and the normalized input.
+        """
+        if self.result_cache is None:
+            return list(compute(inputs))
+        namespace = repr((type(self).__name__, getattr(self, 'file_id', None), getattr(self, 'checksum', None),
+                          getattr(self, 'output', None), getattr(self, 'cpu_optimize', False), method, sorted(params.items())))
+        return self.result_cache.map(namespace, inputs, compute)
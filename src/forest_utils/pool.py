@@ -0,0 +1,142 @@
+import gc
+import sys
+import inspect
+import multiprocessing
+
+from .export_keras import ModelFromH5, ModelFromSavedModel, ModelFromCheckpoint
+from .utils.imports import lazy_import
+
+np = lazy_import('numpy')
+
+# the loaders of the open pools by pool id, inherited by the forked workers, including the ones that
+# replace a worker that died, so they are only dropped once their pool is closed
+_loaders = {}
+# the loader of the pool this worker belongs to
+_loader = None
+
+
+def _init_worker(key, threads):
+    global _loader
+    _loader = _loaders[key]
+    if threads is not None and 'torch' in sys.modules:
+        sys.modules['torch'].set_num_threads(threads)
+
+
+def _run(task):
+    method, inputs, kwargs = task
+    result = getattr(_loader, method)(inputs, **kwargs)
+    if inspect.isgenerator(result):
+        result = list(result)
+    return result
+
+
+def _concat(results):
+    """
+    Joins the results of consecutive batches into the result of one call over all their inputs
+    """
+    if not results:
+        return []
+    first = results[0]
+    if isinstance(first, tuple):
+        return tuple(_concat([result[i] for result in results]) for i in range(len(first)))
+    if hasattr(first, 'dtype') and hasattr(first, 'shape'):
+        return np.concatenate(results)
+    return [item for result in results for item in result]
+
+
+class WorkerPool(object):
+    """
+    Spreads the batched predict calls of one loaded model over several forked worker processes
+
+    The model is loaded once in the parent and the workers are forked afterwards, so they share its
+    read-only weights copy-on-write instead of each loading a copy. Objects alive at that point are
+    moved out of the garbage collector's reach (gc.freeze) so that collections in the workers do not
+    touch, and thereby copy, their memory pages. Batches are handed out through the pool's task queue
+    and their results come back in the order of the inputs.
+
+    Works for the torch based transformer loaders and spaCy. TensorFlow's runtime is not fork-safe
+    (forked workers hang once a model is loaded), so the Keras loaders are refused; TensorFlow already
+    spreads a single model's predictions over all cores with its own thread pools.
+
+    Parameters
+    ----------
+    loader : ModelFrom* instance
+        loader of the model, it is loaded before the workers are started
+    workers : int
+        number of worker processes (by default the number of CPUs)
+    threads_per_worker : int
+        number of torch threads in every worker so workers do not oversubscribe the cores (torch's default if None)
+
+    Methods
+    -------
+    map(method, inputs, batch_size=32, **kwargs)
+        calls a batched predict method of the loader on all inputs, one batch per task
+    map_batches(method, batches, **kwargs)
+        yields the results of a predict method for every batch, in order
+    """
+
+    def __init__(self, loader, workers = None, threads_per_worker = 1):
+        super().__init__()
+
+        try:
+            context = multiprocessing.get_context('fork')
+        except ValueError:
+            raise ValueError("WorkerPool shares the model through fork, which is not available on this platform")
+        if isinstance(loader, (ModelFromH5, ModelFromSavedModel, ModelFromCheckpoint)):
+            raise ValueError("TensorFlow is not fork-safe, {} cannot be shared with forked workers".format(type(loader).__name__))
+
+        loader.load()
+        self.loader = loader
+        self.workers = workers or multiprocessing.cpu_count()
+        _loaders[id(self)] = loader
+        gc.collect()
+        gc.freeze()
+        try:
+            self.pool = context.Pool(self.workers, initializer = _init_worker, initargs = (id(self), threads_per_worker))
+        except:
+            _loaders.pop(id(self), None)
+            raise
+        finally:
+            gc.unfreeze()
+
+    def map_batches(self, method, batches, **kwargs):
+        """
+        Yields the result of loader.<method>(batch, **kwargs) for every batch, in the order of 'batches'
+
+        Parameters
+        ----------
+        method : str
+            name of the predict method, e.g. 'predict_batch', 'embed' or 'process'
+        batches : iterable
+            batches of inputs, consumed lazily while the workers are busy
+        """
+        return self.pool.imap(_run, ((method, batch, kwargs) for batch in batches))
+
+    def map(self, method, inputs, batch_size = 32, **kwargs):
+        """
+        Returns loader.<method>(inputs, **kwargs) computed by the workers, one batch of 'batch_size' inputs at a time
+
+        The results of the batches are joined like a single call would return them: tuples element
+        by element, numpy arrays concatenated and anything else as a list.
+        """
+        if not hasattr(inputs, 'shape'):
+            inputs = list(inputs)
+        # numpy arrays are sliced, so every batch stays one array
+        batches = [inputs[start:start + batch_size] for start in range(0, len(inputs), batch_size)]
+        return _concat(list(self.map_batches(method, batches, **kwargs)))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        _loaders.pop(id(self), None)
+
+    def terminate(self):
+        self.pool.terminate()
+        _loaders.pop(id(self), None)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+        return False
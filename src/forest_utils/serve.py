@@ -0,0 +1,261 @@
+import json
+import asyncio
+import functools
+
+from .export_keras import ModelFromH5, ModelFromSavedModel
+from .export_onnx import ModelFromOnnx
+from .export_spacy import ModelFromSpacy
+from .export_transformers import ModelFromTransformerForClassification, ModelFromTransformerWithLMHead
+from .utils.imports import lazy_import
+
+np = lazy_import('numpy')
+
+REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+
+def predictor_for(loader):
+    """
+    Returns a function mapping a list of inputs to a list of JSON serializable outputs through the
+    batched predict path of 'loader'
+
+    Parameters
+    ----------
+    loader : ModelFrom* instance
+        loader of the model to serve
+    """
+    if isinstance(loader, ModelFromTransformerForClassification):
+        def predict(texts):
+            labels, scores = loader.predict_batch(texts, batch_size = len(texts))
+            return [{'label': label, 'score': float(score)} for label, score in zip(labels, scores)]
+    elif isinstance(loader, ModelFromTransformerWithLMHead):
+        def predict(texts):
+            return loader.embed(texts, batch_size = len(texts)).tolist()
+    elif isinstance(loader, ModelFromSpacy):
+        def predict(texts):
+            return [doc.to_json() for doc in loader.process(texts, batch_size = len(texts))]
+    elif isinstance(loader, (ModelFromH5, ModelFromSavedModel)):
+        def predict(inputs):
+            return loader.predict(np.asarray(inputs), batch_size = len(inputs)).tolist()
+    elif isinstance(loader, ModelFromOnnx):
+        # the task is only known once the model is loaded, which may still be running
+        def predict(inputs):
+            if loader.task == 'classification':
+                labels, scores = loader.predict_batch(inputs, batch_size = len(inputs))
+                return [{'label': label, 'score': float(score)} for label, score in zip(labels, scores)]
+            if loader.task == 'keras':
+                return loader.predict(np.asarray(inputs), batch_size = len(inputs)).tolist()
+            raise TypeError("Cannot serve ONNX models exported for the {} task".format(loader.task))
+    else:
+        raise TypeError("Cannot serve {}".format(type(loader).__name__))
+    return predict
+
+
+class MicroBatcher(object):
+    """
+    Collects concurrent requests into batches for a batched predict function
+
+    A batch is run as soon as it holds 'max_batch_size' inputs or 'max_latency' seconds after its
+    first input arrived, whichever comes first. The predict function runs in the event loop's
+    default executor, so new requests keep being queued while a batch is computed. If a batch fails
+    its inputs are predicted one at a time, so only the requests with a bad input get the error.
+
+    Parameters
+    ----------
+    predict : callable
+        maps a list of inputs to a list of outputs of the same length
+    max_batch_size : int
+        maximum number of inputs per batch
+    max_latency : float
+        maximum number of seconds an input waits for its batch to fill up
+    """
+
+    def __init__(self, predict, max_batch_size = 32, max_latency = 0.01):
+        super().__init__()
+
+        self.predict = predict
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.queue = None
+        self.batch_sizes = []
+
+    def _get_queue(self):
+        if self.queue is None:
+            self.queue = asyncio.Queue()
+        return self.queue
+
+    async def submit(self, item):
+        """
+        Queues a single input and returns its output once its batch has been predicted
+        """
+        future = asyncio.get_event_loop().create_future()
+        await self._get_queue().put((item, future))
+        return await future
+
+    async def run(self):
+        """
+        Forms and runs batches until cancelled
+        """
+        loop = asyncio.get_event_loop()
+        queue = self._get_queue()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_latency
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            self.batch_sizes.append(len(batch))
+            try:
+                await self._predict(batch)
+            except Exception:
+                # a bad input only fails its own request, not the others it was batched with
+                for entry in batch:
+                    try:
+                        await self._predict([entry])
+                    except Exception as error:
+                        if not entry[1].done():
+                            entry[1].set_exception(error)
+
+    async def _predict(self, batch):
+        """
+        Predicts a batch of (input, future) pairs and sets the result of each future
+        """
+        outputs = await asyncio.get_event_loop().run_in_executor(None, self.predict, [item for item, _ in batch])
+        for (_, future), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
+
+
+class ModelServer(object):
+    """
+    Minimal asyncio HTTP/1.1 server exposing a micro-batched predict function
+
+    Endpoints
+    ---------
+    POST /predict
+        body {"inputs": [...]} (or {"input": x}), answers {"outputs": [...]} (or {"output": y})
+    GET /health
+        answers {"status": "ok", "ready": bool}, e.g. while the model is still loading
+
+    Parameters
+    ----------
+    predict : callable
+        batched predict function, see predictor_for()
+    host : str
+        address to listen on
+    port : int
+        port to listen on (0 picks a free one)
+    max_batch_size : int
+        maximum number of inputs per batch
+    max_latency : float
+        maximum number of seconds an input waits for its batch to fill up
+    is_ready : callable
+        returns whether the model is loaded, reported by /health
+    """
+
+    def __init__(self, predict, host = '127.0.0.1', port = 8000, max_batch_size = 32, max_latency = 0.01,
+                 is_ready = None):
+        super().__init__()
+
+        self.batcher = MicroBatcher(predict, max_batch_size, max_latency)
+        self.host = host
+        self.port = port
+        self.is_ready = is_ready or (lambda: True)
+        self.server = None
+        self._batcher_task = None
+
+    async def start(self):
+        """
+        Starts listening and batching, returns the port the server listens on
+        """
+        self._batcher_task = asyncio.ensure_future(self.batcher.run())
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self.port
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self._batcher_task.cancel()
+
+    def serve_forever(self):
+        """
+        Runs the server in a new event loop until interrupted
+        """
+        async def main():
+            await self.start()
+            print('[INFO]:Serving on http://{}:{}'.format(self.host, self.port))
+            await asyncio.Event().wait()
+
+        try:
+            asyncio.run(main())
+        except KeyboardInterrupt:
+            pass
+
+    async def _route(self, method, path, body):
+        if path == '/health' and method == 'GET':
+            return 200, {'status': 'ok', 'ready': bool(self.is_ready())}
+        if path != '/predict':
+            return 404, {'error': 'not found'}
+        if method != 'POST':
+            return 400, {'error': 'use POST'}
+        try:
+            request = json.loads(body.decode('utf-8'))
+            inputs = request['inputs'] if 'inputs' in request else [request['input']]
+        except (ValueError, KeyError, TypeError):
+            return 400, {'error': 'expected a JSON body with "inputs" or "input"'}
+        if not isinstance(inputs, list):
+            return 400, {'error': '"inputs" must be a list'}
+        try:
+            outputs = await asyncio.gather(*(self.batcher.submit(item) for item in inputs))
+        except Exception as error:
+            return 500, {'error': str(error)}
+        return 200, {'outputs': outputs} if 'inputs' in request else {'output': outputs[0]}
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, value = line.decode('latin-1').split(':', 1)
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                status, payload = await self._route(method, path.split('?')[0], body)
+                data = json.dumps(payload).encode('utf-8')
+                writer.write('HTTP/1.1 {} {}\r\nContent-Type: application/json\r\nContent-Length: {}\r\n\r\n'.format(
+                    status, REASONS[status], len(data)).encode('latin-1') + data)
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close' or version == 'HTTP/1.0':
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def serve(loader, host = '127.0.0.1', port = 8000, max_batch_size = 32, max_latency = 0.01):
+    """
+    Serves a ModelFrom* loader over HTTP, answering health checks while the model is still loading
+
+    Parameters
+    ----------
+    loader : ModelFrom* instance
+        loader of the model to serve, ideally constructed with lazy=True
+    """
+    loader.load_future()
+    server = ModelServer(predictor_for(loader), host, port, max_batch_size, max_latency,
+                         is_ready = functools.partial(getattr, loader, 'is_loaded'))
+    server.serve_forever()
@@ -0,0 +1,280 @@
+import os
+import shutil
+import contextlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
+
+from . import metrics
+from . import verify
+from .download import download
+from .extract import extract
+from .resolve import OfflineError, is_offline
+
+CACHE_DIR_ENV = 'FOREST_CACHE_DIR'
+CACHE_SIZE_ENV = 'FOREST_CACHE_SIZE'
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'forest')
+
+
+def get_file_id(url):
+    """
+    Returns the Google Drive file id from a 'Link' of the model zoo's result.json
+
+    Parameters
+    ----------
+    url : str
+        Google Drive link of the form https://drive.google.com/file/d/<id>/view
+    """
+    return url.split('/')[5]
+
+
+@contextlib.contextmanager
+def _locked(path, blocking = True):
+    """
+    Holds an exclusive lock on the file at 'path' for the duration of the block.
+
+    Yields False without waiting if 'blocking' is False and another process holds the lock.
+    """
+    with open(path, 'a+') as file:
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                msvcrt.locking(file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        except OSError:
+            if blocking:
+                raise
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class ModelCache(object):
+    """
+    A content-addressed cache of model zoo artifacts shared by all loaders and processes.
+
+    Every artifact lives in its own entry directory named after the Google Drive file id
+    (and checksum, when known), so different models never overwrite each other.
+    Downloads are written to a temporary file and renamed into place, a lock file per
+    entry makes concurrent workers wait for a single download, and the least recently
+    used entries are evicted once the cache grows past 'max_size'.
+
+    Parameters
+    ----------
+    root : str
+        cache directory (defaults to $FOREST_CACHE_DIR or ~/.cache/forest)
+    max_size : int
+        size cap of the cache in bytes (defaults to $FOREST_CACHE_SIZE, unlimited if unset)
+    offline : bool
+        raise OfflineError on a miss instead of downloading (defaults to $FOREST_OFFLINE)
+
+    Methods
+    -------
+    cached(file_id, filename, checksum=None)
+        returns whether the artifact is already in the cache
+    fetch(file_id, filename, download, checksum=None, force_download=False)
+        returns the path of the cached artifact, downloading it on a miss
+    fetch_extracted(file_id, filename, download, checksum=None, force_download=False, keep_archive=True)
+        returns the directory a cached zip artifact is extracted into, downloading it on a miss
+    evict(keep=())
+        removes least recently used entries until the cache fits 'max_size'
+    """
+
+    def __init__(self, root = None, max_size = None, offline = None):
+        super().__init__()
+
+        self.root = root or os.environ.get(CACHE_DIR_ENV) or DEFAULT_CACHE_DIR
+        if max_size is None and os.environ.get(CACHE_SIZE_ENV):
+            max_size = int(os.environ[CACHE_SIZE_ENV])
+        self.max_size = max_size
+        self.offline = is_offline(offline)
+        os.makedirs(self.root, exist_ok = True)
+
+    def key(self, file_id, checksum = None):
+        """
+        Returns the name of the cache entry for the given file id and optional checksum
+        """
+        if checksum:
+            return '{}-{}'.format(file_id, checksum[:16])
+        return file_id
+
+    def entry_dir(self, key):
+        return os.path.join(self.root, key)
+
+    def _lock_path(self, key):
+        return os.path.join(self.root, key + '.lock')
+
+    def _touch(self, key):
+        os.utime(self.entry_dir(key))
+
+    def cached(self, file_id, filename, checksum = None, size = None):
+        """
+        Returns whether the intact artifact (or its extracted directory) is already in the cache.
+
+        Artifacts are only renamed into the cache after they are completely downloaded and verified,
+        and are checked again against 'size' and 'checksum' (see verify.Stamp) in case they changed since.
+        """
+        entry = self.entry_dir(self.key(file_id, checksum))
+        return verify.Stamp(os.path.join(entry, filename)).intact(size, checksum) or os.path.isdir(os.path.join(entry, 'extracted'))
+
+    def fetch(self, file_id, filename, download, checksum = None, force_download = False, size = None):
+        """
+        Returns the path of 'filename' inside the cache entry of 'file_id'.
+
+        On a miss 'download' is called with a temporary path to write the artifact to, which is
+        verified against 'size' and 'checksum' (if given) and then atomically renamed into place. The
+        temporary path is the same on every attempt, so a resumable downloader can continue a failed
+        download. A cached artifact is only hashed again if its size or modification time changed
+        since it was verified, and downloaded again if it no longer matches.
+
+        Parameters
+        ----------
+        file_id : str
+            Google Drive id of the artifact
+        filename : str
+            name of the artifact inside its cache entry, e.g. 'model.zip'
+        download : callable
+            called as download(path) to write the artifact to 'path'
+        checksum : str
+            expected SHA-256 of the artifact
+        force_download : bool
+            download again even if the entry already exists
+        size : int
+            expected size of the artifact in bytes
+        """
+        key = self.key(file_id, checksum)
+        entry = self.entry_dir(key)
+        path = os.path.join(entry, filename)
+
+        with _locked(self._lock_path(key)):
+            if os.path.exists(path) and not force_download:
+                if verify.Stamp(path).intact(size, checksum):
+                    metrics.emit('cache_hits', 1, model = file_id)
+                    self._touch(key)
+                    return path
+                print("[WARNING]:Cached {} of {} is corrupted, downloading it again".format(filename, file_id))
+
+            metrics.emit('cache_misses', 1, model = file_id)
+            if self.offline:
+                raise OfflineError("{} is not in the model cache {} and cannot be downloaded in offline mode".format(
+                    file_id, self.root))
+            os.makedirs(entry, exist_ok = True)
+            tmp = os.path.join(entry, '.' + filename + '.tmp')
+            try:
+                with metrics.phase('download', model = file_id):
+                    download(tmp)
+                metrics.emit('download_bytes', os.path.getsize(tmp), model = file_id)
+                with metrics.phase('verify', model = file_id):
+                    if os.path.getsize(tmp) == 0:
+                        raise IOError("Downloaded file for {} is empty".format(file_id))
+                    problem = verify.check(tmp, size, checksum or None)
+                    if problem is not None:
+                        raise IOError("Downloaded file for {} does not match result.json: {}".format(file_id, problem))
+                os.replace(tmp, path)
+                if checksum:
+                    verify.Stamp(path).write(checksum)
+            finally:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+            self._touch(key)
+
+        self.evict(keep = (key,))
+        return path
+
+    def fetch_extracted(self, file_id, filename, download, checksum = None, force_download = False,
+                        keep_archive = True, size = None):
+        """
+        Returns the directory inside the cache entry of 'file_id' that the zip 'filename' is extracted into.
+
+        The archive is fetched like in fetch() and extracted next to it, never into the working
+        directory. With 'keep_archive' set to False the archive is deleted once extracted, and the
+        extracted directory alone keeps serving later calls.
+        """
+        key = self.key(file_id, checksum)
+        target = os.path.join(self.entry_dir(key), 'extracted')
+
+        with _locked(self._lock_path(key)):
+            if os.path.isdir(target) and not force_download:
+                metrics.emit('cache_hits', 1, model = file_id)
+                self._touch(key)
+                return target
+
+        archive = self.fetch(file_id, filename, download, checksum = checksum, force_download = force_download, size = size)
+        with _locked(self._lock_path(key)):
+            if not os.path.isdir(target) or force_download:
+                with metrics.phase('extract', model = file_id):
+                    extract(archive, target)
+            if not keep_archive and os.path.exists(archive):
+                os.remove(archive)
+                if os.path.exists(archive + '.verified'):
+                    os.remove(archive + '.verified')
+            self._touch(key)
+
+        # the extracted directory counts towards 'max_size' too
+        self.evict(keep = (key,))
+        return target
+
+    def entries(self):
+        """
+        Returns (last access time, size in bytes, key) for every entry, least recently used first
+        """
+        entries = []
+        for key in os.listdir(self.root):
+            entry = self.entry_dir(key)
+            if not os.path.isdir(entry):
+                continue
+            size = 0
+            for dirpath, _, filenames in os.walk(entry):
+                for name in filenames:
+                    size += os.path.getsize(os.path.join(dirpath, name))
+            entries.append((os.path.getmtime(entry), size, key))
+        return sorted(entries)
+
+    def evict(self, keep = ()):
+        """
+        Removes the least recently used entries until the cache fits 'max_size'.
+
+        Entries listed in 'keep' and entries locked by another worker are never removed.
+        """
+        if self.max_size is None:
+            return
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in entries:
+            if total <= self.max_size:
+                break
+            if key in keep:
+                continue
+            with _locked(self._lock_path(key), blocking = False) as acquired:
+                if not acquired:
+                    continue
+                shutil.rmtree(self.entry_dir(key), ignore_errors = True)
+            total -= size
+
+
+def fetch(url_id, file_id, filename, checksum = None, force_download = False, offline = None, size = None):
+    """
+    Returns the path of a model zoo artifact in the default cache, downloading it from 'url_id' on a miss
+    """
+    return ModelCache(offline = offline).fetch(file_id, filename, lambda path: download(url_id, path),
+                                               checksum = checksum, force_download = force_download, size = size)
+
+
+def fetch_extracted(url_id, file_id, filename, checksum = None, force_download = False, keep_archive = True,
+                    offline = None, size = None):
+    """
+    Returns the directory a zipped model zoo artifact is extracted into in the default cache
+    """
+    return ModelCache(offline = offline).fetch_extracted(file_id, filename, lambda path: download(url_id, path),
+                                                         checksum = checksum, force_download = force_download,
+                                                         keep_archive = keep_archive, size = size)
@@ -31,6 +31,8 @@ def create_json(FOLDER):
     params['Overview'] = 'docs/overview.md'
     params['Preprocessing'] = 'templates/<template_filename>'
     params['Link'] = '<link to pretrained model>'
+    params['Files'] = [{'Name': '<file name of the pretrained model, e.g. model.zip>', 'Size': '<size in bytes>',
+                        'SHA256': '<SHA-256 of the file, filled in by forest verify --update>'}]
     params['References'] = 'docs/references.md'
     params['Usage'] = 'templates/<usage_filename>'
     
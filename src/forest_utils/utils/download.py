@@ -0,0 +1,274 @@
+import os
+import re
+import html
+import json
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+from . import verify
+from .imports import lazy_import
+
+requests = lazy_import('requests')
+
+CHUNK_SIZE = 8 * 1024 * 1024
+BLOCK_SIZE = 1024 * 1024
+
+
+class DownloadError(IOError):
+    """
+    Raised when a download fails or the downloaded file does not match the expected size or hash
+    """
+
+
+def get_session(jobs = 4):
+    """
+    Returns a requests session whose connection pool can serve 'jobs' concurrent range requests
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections = jobs, pool_maxsize = jobs, max_retries = 3)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def _is_drive_page(url, response):
+    """
+    Returns whether Google Drive answered 'url' with an HTML page instead of the file
+    """
+    drive = re.compile(r'//drive(\.usercontent)?\.google\.com/')
+    return bool(drive.search(url) or drive.search(response.url or '')) and \
+        'text/html' in response.headers.get('Content-Type', '')
+
+
+def _confirm_drive_url(url, response):
+    """
+    Returns the url to request again when Google Drive answers with its "can't scan for viruses" page
+    """
+    if not _is_drive_page(url, response):
+        return None
+    for name, value in response.cookies.items():
+        if name.startswith('download_warning'):
+            return url + '&confirm=' + value
+    # the current page submits a form to drive.usercontent.google.com with the confirmation in hidden inputs
+    form = re.search(r'id="download-form"[^>]*action="([^"]+)"', response.text)
+    if form:
+        action = urllib.parse.urlsplit(html.unescape(form.group(1)))
+        query = urllib.parse.parse_qs(action.query)
+        for name, value in re.findall(r'<input type="hidden" name="([^"]+)" value="([^"]*)"', response.text):
+            query[name] = html.unescape(value)
+        return urllib.parse.urlunsplit(action._replace(query = urllib.parse.urlencode(query, doseq = True)))
+    match = re.search(r'confirm=([0-9A-Za-z_-]+)', response.text)
+    if match:
+        return url + '&confirm=' + match.group(1)
+    return None
+
+
+def _check_not_drive_page(url, response):
+    """
+    Raises DownloadError if Google Drive answered with a page (e.g. a quota or an unknown confirmation page)
+    instead of the file, which would otherwise be saved as the artifact
+    """
+    if _is_drive_page(url, response):
+        raise DownloadError("Google Drive returned a web page instead of {}, the download could not be confirmed".format(url))
+
+
+def _probe(session, url, timeout):
+    """
+    Returns the final url, the total size (None if unknown) and whether the server accepts range requests
+    """
+    response = session.get(url, headers = {'Range': 'bytes=0-0'}, stream = True, timeout = timeout)
+    confirmed = _confirm_drive_url(url, response)
+    if confirmed is not None:
+        response.close()
+        url = confirmed
+        response = session.get(url, headers = {'Range': 'bytes=0-0'}, stream = True, timeout = timeout)
+    with response:
+        response.raise_for_status()
+        _check_not_drive_page(url, response)
+        if response.status_code == 206 and '/' in response.headers.get('Content-Range', ''):
+            total = response.headers['Content-Range'].rsplit('/', 1)[1]
+            if total != '*':
+                return response.url, int(total), True
+        length = response.headers.get('Content-Length')
+        return response.url, int(length) if length else None, False
+
+
+def get_etag(url, session = None, timeout = 60):
+    """
+    Returns the ETag (or Last-Modified date) the server reports for 'url', None if it sends neither
+
+    Used to check whether a small index file changed without downloading it again.
+    """
+    session = session or get_session(1)
+    try:
+        response = session.get(url, headers = {'Range': 'bytes=0-0'}, stream = True, timeout = timeout)
+        confirmed = _confirm_drive_url(url, response)
+        if confirmed is not None:
+            response.close()
+            response = session.get(confirmed, headers = {'Range': 'bytes=0-0'}, stream = True, timeout = timeout)
+        with response:
+            response.raise_for_status()
+            return response.headers.get('ETag') or response.headers.get('Last-Modified')
+    except requests.RequestException as error:
+        raise DownloadError("Error while checking {}: {}".format(url, error))
+
+
+class _State(object):
+    """
+    Tracks which chunks of a '.part' file are complete in a '.part.json' file next to it
+    """
+
+    def __init__(self, path, total, chunk_size):
+        super().__init__()
+
+        self.path = path
+        self.lock = threading.Lock()
+        self.header = {'size': total, 'chunk_size': chunk_size}
+        self.done = set()
+        try:
+            with open(path, 'r') as file:
+                saved = json.load(file)
+            if saved['size'] == total and saved['chunk_size'] == chunk_size:
+                self.done = set(saved['done'])
+        except (IOError, ValueError, KeyError):
+            pass
+
+    def complete(self, start):
+        with self.lock:
+            self.done.add(start)
+            tmp = self.path + '.tmp'
+            with open(tmp, 'w') as file:
+                json.dump(dict(self.header, done = sorted(self.done)), file)
+            os.replace(tmp, self.path)
+
+
+class _Progress(object):
+    """
+    Thread safe byte counter forwarding updates to the user's progress callback
+    """
+
+    def __init__(self, callback, total, done = 0):
+        super().__init__()
+
+        self.callback = callback
+        self.total = total
+        self.done = done
+        self.lock = threading.Lock()
+
+    def update(self, count):
+        with self.lock:
+            self.done += count
+            if self.callback is not None:
+                self.callback(self.done, self.total)
+
+
+def _fetch_range(session, url, part, start, end, progress, timeout):
+    headers = {'Range': 'bytes={}-{}'.format(start, end)}
+    with session.get(url, headers = headers, stream = True, timeout = timeout) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            raise DownloadError("Server ignored range request for bytes {}-{}".format(start, end))
+        with open(part, 'r+b') as file:
+            file.seek(start)
+            for block in response.iter_content(BLOCK_SIZE):
+                file.write(block)
+                progress.update(len(block))
+            if file.tell() != end + 1:
+                raise DownloadError("Incomplete range bytes {}-{}".format(start, end))
+
+
+def _download_ranges(session, url, part, total, jobs, chunk_size, progress_callback, timeout):
+    state = _State(part + '.json', total, chunk_size)
+    if not os.path.exists(part):
+        state.done = set()
+    mode = 'r+b' if os.path.exists(part) else 'wb'
+    with open(part, mode) as file:
+        file.truncate(total)
+
+    pending = [start for start in range(0, total, chunk_size) if start not in state.done]
+    done_bytes = sum(min(chunk_size, total - start) for start in state.done)
+    progress = _Progress(progress_callback, total, done_bytes)
+
+    def fetch(start):
+        _fetch_range(session, url, part, start, min(start + chunk_size, total) - 1, progress, timeout)
+        state.complete(start)
+
+    with ThreadPoolExecutor(max_workers = jobs) as executor:
+        for future in [executor.submit(fetch, start) for start in pending]:
+            future.result()
+
+
+def _download_stream(session, url, part, total, progress_callback, timeout):
+    progress = _Progress(progress_callback, total)
+    with session.get(url, stream = True, timeout = timeout) as response:
+        response.raise_for_status()
+        _check_not_drive_page(url, response)
+        with open(part, 'wb') as file:
+            for block in response.iter_content(BLOCK_SIZE):
+                file.write(block)
+                progress.update(len(block))
+
+
+def download(url, output, size = None, sha256 = None, jobs = 4, chunk_size = CHUNK_SIZE,
+             progress = None, session = None, timeout = 60):
+    """
+    Downloads 'url' to 'output' with concurrent range requests, resuming any earlier partial download.
+
+    Data is written to 'output.part' and only renamed to 'output' once its size and hash are verified,
+    so an interrupted download continues from the chunks already written on the next call.
+    Servers without range support are downloaded in a single stream.
+
+    Parameters
+    ----------
+    url : str
+        url of the file (Google Drive 'uc?id=' links are confirmed automatically, DownloadError is raised
+        if Drive still answers with a web page)
+    output : str
+        path to write the file to
+    size : int
+        expected size in bytes, checked in addition to the size reported by the server
+    sha256 : str
+        expected SHA-256 hex digest of the file
+    jobs : int
+        number of concurrent range requests
+    chunk_size : int
+        size in bytes of each range request
+    progress : callable
+        called as progress(downloaded_bytes, total_bytes) from the worker threads, total may be None
+    session : requests.Session
+        session to reuse, a pooled one is created if not given
+    timeout : float
+        timeout in seconds for each request
+
+    Returns
+    -------
+    output : str
+        path of the downloaded file
+    """
+    session = session or get_session(jobs)
+    part = output + '.part'
+    try:
+        url, total, ranges = _probe(session, url, timeout)
+        if size is not None and total is not None and size != total:
+            raise DownloadError("Expected {} bytes but server reports {}".format(size, total))
+        if ranges and total:
+            _download_ranges(session, url, part, total, jobs, chunk_size, progress, timeout)
+        else:
+            _download_stream(session, url, part, total, progress, timeout)
+    except requests.RequestException as error:
+        raise DownloadError("Error while downloading {}: {}".format(url, error))
+
+    expected = size if size is not None else total
+    if expected is not None and os.path.getsize(part) != expected:
+        raise DownloadError("Expected {} bytes but downloaded {}".format(expected, os.path.getsize(part)))
+    if sha256 is not None and verify.hash_file(part) != sha256:
+        os.remove(part)
+        if os.path.exists(part + '.json'):
+            os.remove(part + '.json')
+        raise DownloadError("SHA-256 mismatch for {}".format(output))
+
+    os.replace(part, output)
+    if os.path.exists(part + '.json'):
+        os.remove(part + '.json')
+    return output
@@ -0,0 +1,66 @@
+import os
+import shutil
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+LARGE_MEMBER = 64 * 1024 * 1024
+
+
+def _extract_member(archive, member, target):
+    """
+    Extracts a single member using its own handle on the archive, so several can be inflated at once
+    """
+    with zipfile.ZipFile(archive, 'r') as zip_ref:
+        zip_ref.extract(member, target)
+
+
+def extract(archive, target, jobs = 4, large_member = LARGE_MEMBER):
+    """
+    Extracts a zip archive into the 'target' directory entry by entry.
+
+    Members of at least 'large_member' bytes are decompressed in parallel on 'jobs' threads while the
+    small ones are extracted in order. Everything is written to 'target.tmp' first and renamed to
+    'target' once complete, so an interrupted extraction is never mistaken for a finished one.
+
+    Parameters
+    ----------
+    archive : str
+        path to the zip file
+    target : str
+        directory to extract into (replaced if it already exists)
+    jobs : int
+        number of threads decompressing large members
+    large_member : int
+        uncompressed size in bytes from which a member is decompressed in parallel
+
+    Returns
+    -------
+    target : str
+        path of the extracted directory
+    """
+    tmp = target + '.tmp'
+    shutil.rmtree(tmp, ignore_errors = True)
+    os.makedirs(tmp)
+    root = os.path.realpath(tmp)
+
+    with zipfile.ZipFile(archive, 'r') as zip_ref:
+        members = zip_ref.infolist()
+        large = [member for member in members if member.file_size >= large_member and not member.is_dir()]
+        for member in large:
+            # create parent directories up front so the threads never race on them
+            parent = os.path.realpath(os.path.dirname(os.path.join(tmp, member.filename)))
+            if parent.startswith(root):
+                os.makedirs(parent, exist_ok = True)
+
+        with ThreadPoolExecutor(max_workers = jobs) as executor:
+            futures = [executor.submit(_extract_member, archive, member, tmp) for member in large]
+            for member in members:
+                if member.file_size < large_member or member.is_dir():
+                    zip_ref.extract(member, tmp)
+            for future in futures:
+                future.result()
+
+    if os.path.exists(target):
+        shutil.rmtree(target)
+    os.replace(tmp, target)
+    return target
@@ -0,0 +1,39 @@
+import importlib
+import types
+
+
+class _LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is only imported when one of its attributes is first used
+    """
+
+    def _load(self):
+        module = self.__dict__.get('_module')
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+
+def lazy_import(name):
+    """
+    Returns a proxy for the module 'name' that imports it on first attribute access.
+
+    Used for the heavy frameworks (tensorflow, torch, transformers, spacy, pandas), so that importing
+    forest_utils or running the forest CLI does not pay for frameworks that are never used:
+
+        tf = lazy_import('tensorflow')   # nothing imported yet
+        tf.keras.models.load_model(path) # tensorflow is imported here
+
+    Parameters
+    ----------
+    name : str
+        absolute name of the module
+    """
+    return _LazyModule(name)
@@ -0,0 +1,155 @@
+import pickle
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+
+
+def normalize(text):
+    """
+    Returns the form of 'text' results are memoized under: NFC normalized with whitespace collapsed
+    """
+    return ' '.join(unicodedata.normalize('NFC', text).split())
+
+
+def _fingerprint(item):
+    if isinstance(item, str):
+        return normalize(item).encode('utf-8')
+    if hasattr(item, 'tobytes') and hasattr(item, 'dtype'):
+        return '{}{}'.format(item.dtype, item.shape).encode('ascii') + item.tobytes()
+    return pickle.dumps(item, protocol = 4)
+
+
+class ResultCache(object):
+    """
+    Memoizes model outputs per input, in a bounded in-memory LRU with an optional SQLite tier on disk
+
+    Results are keyed by a hash of the normalized input and a namespace identifying the model, the
+    method and its parameters, so a cache can be shared by several models. map() cooperates with
+    batched predict functions: only the inputs that are not cached are passed on to the model.
+
+    Parameters
+    ----------
+    max_size : int
+        number of results kept in memory, least recently used ones are dropped first
+    path : str
+        SQLite database keeping every result on disk, so they survive restarts (memory only if None)
+
+    Attributes
+    ----------
+    hits, disk_hits, misses : int
+        number of inputs found in memory, found on disk, and not found in the cache
+    """
+
+    def __init__(self, max_size = 10000, path = None):
+        super().__init__()
+
+        self.max_size = max_size
+        self.path = path
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()
+        self.hits = self.disk_hits = self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread = False)
+            self.db.execute('CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value BLOB)')
+            self.db.commit()
+
+    def key(self, namespace, item):
+        return hashlib.sha256(namespace.encode('utf-8') + b'\0' + _fingerprint(item)).hexdigest()
+
+    def _get(self, key):
+        if key in self.memory:
+            self.memory.move_to_end(key)
+            self.hits += 1
+            return True, self.memory[key]
+        if self.db is not None:
+            row = self.db.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is not None:
+                self.disk_hits += 1
+                value = pickle.loads(row[0])
+                self._remember(key, value)
+                return True, value
+        return False, None
+
+    def _remember(self, key, value):
+        self.memory[key] = value
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last = False)
+
+    def _put_many(self, items):
+        for key, value in items:
+            self._remember(key, value)
+        if self.db is not None:
+            self.db.executemany('INSERT OR REPLACE INTO results VALUES (?, ?)',
+                                [(key, pickle.dumps(value, protocol = 4)) for key, value in items])
+            self.db.commit()
+
+    def map(self, namespace, inputs, compute):
+        """
+        Returns the result of every input, calling compute only for the inputs not cached yet
+
+        Parameters
+        ----------
+        namespace : str
+            identity of the model, method and parameters the results belong to
+        inputs : list
+            texts (or numpy arrays, or any picklable inputs)
+        compute : callable
+            called as compute(missing_inputs) and returning one result per input, in order;
+            duplicates among the missing inputs are only passed once
+
+        Returns
+        -------
+        results : list
+            one result per input, in the order of 'inputs'
+        """
+        keys = [self.key(namespace, item) for item in inputs]
+        results = [None] * len(keys)
+        missing = OrderedDict()
+        with self.lock:
+            for index, key in enumerate(keys):
+                found, value = self._get(key)
+                if found:
+                    results[index] = value
+                else:
+                    missing.setdefault(key, []).append(index)
+            self.misses += sum(map(len, missing.values()))
+        if not missing:
+            return results
+
+        computed = list(compute([inputs[indices[0]] for indices in missing.values()]))
+        if len(computed) != len(missing):
+            raise ValueError("compute returned {} results for {} inputs".format(len(computed), len(missing)))
+        with self.lock:
+            self._put_many(list(zip(missing, computed)))
+        for indices, value in zip(missing.values(), computed):
+            for index in indices:
+                results[index] = value
+        return results
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.disk_hits + self.misses
+        return (self.hits + self.disk_hits) / total if total else 0.0
+
+    def stats(self):
+        """
+        Returns the hit and miss counts, the hit rate and the number of results kept in memory
+        """
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses,
+                'hit_rate': self.hit_rate, 'size': len(self.memory)}
+
+    def clear(self):
+        with self.lock:
+            self.memory.clear()
+            if self.db is not None:
+                self.db.execute('DELETE FROM results')
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,166 @@
+import time
+import logging
+import inspect
+import threading
+import functools
+import contextlib
+
+logger = logging.getLogger('forest_utils')
+
+PHASES = ('resolve', 'download', 'verify', 'extract', 'deserialize', 'first_predict')
+
+_hooks = []
+_null_phase = contextlib.nullcontext()
+
+
+def add_hook(hook):
+    """
+    Registers a metric hook, called as hook(name, value, labels) for every metric emitted.
+
+    Metrics are only collected while a hook is registered or the 'forest_utils' logger is enabled
+    for DEBUG, otherwise every instrumentation point is a single check.
+
+    Metrics
+    -------
+    phase_seconds
+        duration of a phase (label 'phase' is one of PHASES)
+    download_bytes
+        size of a downloaded artifact or dataset
+    cache_hits, cache_misses
+        1 for every artifact found in, or missing from, the local cache
+    """
+    _hooks.append(hook)
+    return hook
+
+
+def remove_hook(hook):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def enabled():
+    return bool(_hooks) or logger.isEnabledFor(logging.DEBUG)
+
+
+def emit(name, value, **labels):
+    """
+    Sends a metric to the logger and to every registered hook
+    """
+    if not enabled():
+        return
+    logger.debug('%s=%s %s', name, value, labels)
+    for hook in list(_hooks):
+        hook(name, value, labels)
+
+
+class _Phase(object):
+
+    def __init__(self, name, labels):
+        self.labels = dict(labels, phase = name)
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        emit('phase_seconds', time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+def phase(name, **labels):
+    """
+    Returns a context manager emitting the time spent inside it as 'phase_seconds'
+
+        with metrics.phase('download', model = file_id):
+            ...
+    """
+    if not enabled():
+        return _null_phase
+    return _Phase(name, labels)
+
+
+def _first_item(generator, labels, start):
+    try:
+        first = next(generator)
+    except StopIteration:
+        return
+    finally:
+        emit('phase_seconds', time.perf_counter() - start, phase = 'first_predict', **labels)
+    yield first
+    yield from generator
+
+
+def first_predict(method):
+    """
+    Decorator timing the first call of a loader's predict method as the 'first_predict' phase.
+
+    For methods returning a generator the time until its first item is measured.
+    """
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self.__dict__.get('_predicted') or not enabled():
+            return method(self, *args, **kwargs)
+        self._predicted = True
+        labels = {'loader': type(self).__name__}
+        start = time.perf_counter()
+        result = method(self, *args, **kwargs)
+        if inspect.isgenerator(result):
+            return _first_item(result, labels, start)
+        emit('phase_seconds', time.perf_counter() - start, phase = 'first_predict', **labels)
+        return result
+    return wrapper
+
+
+class PrometheusExporter(object):
+    """
+    Metric hook aggregating the metrics into the Prometheus text exposition format
+
+        exporter = metrics.add_hook(metrics.PrometheusExporter())
+        ...
+        print(exporter.render())
+
+    Phase durations are exported as summaries (<prefix>_phase_seconds_sum and _count), every
+    other metric as a counter (<prefix>_<name>_total).
+
+    Parameters
+    ----------
+    prefix : str
+        prefix of every exported metric name
+    """
+
+    def __init__(self, prefix = 'forest'):
+        super().__init__()
+
+        self.prefix = prefix
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def _add(self, name, labels, value):
+        key = (name, tuple(sorted(labels.items())))
+        self.values[key] = self.values.get(key, 0) + value
+
+    def __call__(self, name, value, labels):
+        with self.lock:
+            if name == 'phase_seconds':
+                self._add(name + '_sum', labels, value)
+                self._add(name + '_count', labels, 1)
+            else:
+                self._add(name + '_total', labels, value)
+
+    def render(self):
+        """
+        Returns the aggregated metrics in the Prometheus text format
+        """
+        lines = []
+        with self.lock:
+            values = sorted(self.values.items())
+        declared = set()
+        for (name, labels), value in values:
+            family = name[:-len('_sum')] if name.endswith('_sum') else name[:-len('_count')] if name.endswith('_count') else name
+            if family not in declared:
+                declared.add(family)
+                kind = 'summary' if family == 'phase_seconds' else 'counter'
+                lines.append('# TYPE {}_{} {}'.format(self.prefix, family, kind))
+            text = ','.join('{}="{}"'.format(key, str(label).replace('\\', '\\\\').replace('"', '\\"')) for key, label in labels)
+            lines.append('{}_{}{} {}'.format(self.prefix, name, '{' + text + '}' if text else '', value))
+        return '\n'.join(lines) + '\n'
@@ -1,8 +1,119 @@
-import requests
-import wget
-
-def get_model_from_zoo(modelname):
-    res = wget.download(modelname)
-    print(res)
-    
-get_model_from_zoo('https://github.com/smoke-trees/model-zoo/tree/master/CORD-Spacy-word2vec')
\ No newline at end of file
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from . import cache
+from . import verify
+from .resolve import resolve_config
+
+
+def artifact_name(config):
+    """
+    Returns the file name the loaders store the artifact of 'config' under in the model cache
+    """
+    if 'h5' in config.get('Model Format', '').lower():
+        return 'model.h5'
+    return 'model.zip'
+
+
+class Throughput(object):
+    """
+    Aggregates the progress of concurrent downloads and reports the combined throughput
+
+    Parameters
+    ----------
+    report : callable
+        called as report(downloaded_bytes, seconds) at most every 'interval' seconds
+    interval : float
+        minimum number of seconds between two reports
+    """
+
+    def __init__(self, report = None, interval = 0.5):
+        super().__init__()
+
+        self.report = report
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.downloaded = {}
+        self.start = time.time()
+        self.last = 0
+
+    @property
+    def total(self):
+        return sum(self.downloaded.values())
+
+    @property
+    def elapsed(self):
+        return time.time() - self.start
+
+    def callback(self, name):
+        """
+        Returns a progress callback for the downloader that counts towards the aggregate
+        """
+        def update(done, total):
+            with self.lock:
+                self.downloaded[name] = done
+                now = time.time()
+                if self.report is None or now - self.last < self.interval:
+                    return
+                self.last = now
+                self.report(self.total, self.elapsed)
+        return update
+
+
+def pull_model(model, throughput = None, force_download = False):
+    """
+    Downloads the artifact of a model zoo entry into the model cache unless it is already there
+
+    Returns
+    -------
+    status : str
+        'cached' if the verified artifact was already present, 'downloaded' otherwise
+    """
+    config = resolve_config(model)
+    file_id = cache.get_file_id(config['Link'])
+    filename = artifact_name(config)
+    size, checksum = verify.expected(config, filename)
+    model_cache = cache.ModelCache()
+    if not force_download and model_cache.cached(file_id, filename, checksum, size):
+        return 'cached'
+
+    progress = throughput.callback(model) if throughput is not None else None
+    url_id = 'https://drive.google.com/uc?id=' + file_id
+    model_cache.fetch(file_id, filename, lambda path: cache.download(url_id, path, progress = progress),
+                      checksum = checksum, force_download = force_download, size = size)
+    return 'downloaded'
+
+
+def pull_models(models, jobs = 4, force_download = False, report = None):
+    """
+    Prefetches several model zoo artifacts into the model cache with at most 'jobs' concurrent downloads
+
+    Parameters
+    ----------
+    models : list
+        model zoo names or paths to result.json files, see resolve.resolve_config()
+    jobs : int
+        number of models downloaded at once
+    force_download : bool
+        download again even if the artifact is already cached
+    report : callable
+        called as report(downloaded_bytes, seconds) with the aggregate progress of all downloads
+
+    Returns
+    -------
+    results : dict
+        maps each model to 'cached', 'downloaded' or the exception that made it fail
+    throughput : Throughput
+        aggregate statistics of the downloads
+    """
+    throughput = Throughput(report)
+    results = {}
+    with ThreadPoolExecutor(max_workers = jobs) as executor:
+        futures = {model: executor.submit(pull_model, model, throughput, force_download) for model in models}
+        for model, future in futures.items():
+            try:
+                results[model] = future.result()
+            except Exception as error:
+                results[model] = error
+    return results, throughput
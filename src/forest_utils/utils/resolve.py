@@ -0,0 +1,88 @@
+import os
+import json
+
+from .imports import lazy_import
+
+requests = lazy_import('requests')
+
+ZOO_URL = 'https://raw.githubusercontent.com/smoke-trees/model-zoo/master/{}/result.json'
+OFFLINE_ENV = 'FOREST_OFFLINE'
+MANIFEST_ENV = 'FOREST_MANIFEST'
+
+
+class OfflineError(IOError):
+    """
+    Raised in offline mode when something is not available locally
+    """
+
+
+def is_offline(offline = None):
+    """
+    Returns 'offline' if it is given, otherwise whether the FOREST_OFFLINE environment variable is set
+    """
+    if offline is not None:
+        return offline
+    return os.environ.get(OFFLINE_ENV, '').lower() in ('1', 'true', 'yes', 'on')
+
+
+def _from_manifest(model, manifest):
+    """
+    Returns the result.json of 'model' from a vendored copy of the model zoo, None if it is not there
+
+    The manifest is either a checkout of the model zoo (a directory with one '<model>/result.json'
+    per model) or a JSON file mapping model names to their result.json.
+    """
+    if os.path.isdir(manifest):
+        path = os.path.join(manifest, model, 'result.json')
+        if not os.path.isfile(path):
+            return None
+        with open(path, 'r') as file:
+            return json.load(file)
+    with open(manifest, 'r') as file:
+        return json.load(file).get(model)
+
+
+def resolve_config(model = 'result.json', manifest = None, offline = None):
+    """
+    Returns the result.json of a model zoo entry
+
+    Parameters
+    ----------
+    model : str or dict
+        the result.json itself, a path to one, a folder containing one, or the name of a model zoo
+        folder (by default it is the result.json of the working directory)
+    manifest : str
+        vendored copy of the model zoo looked up by name before the network, see _from_manifest()
+        (by default the FOREST_MANIFEST environment variable)
+    offline : bool
+        never fetch the result.json from the model zoo (by default the FOREST_OFFLINE environment variable)
+
+    Raises
+    ------
+    FileNotFoundError
+        if 'model' is a path (ends in .json or contains a path separator) that does not exist
+    OfflineError
+        in offline mode, if the model is neither a local file nor in the manifest
+    """
+    if isinstance(model, dict):
+        return model
+    if os.path.isdir(model):
+        model = os.path.join(model, 'result.json')
+    if os.path.isfile(model):
+        with open(model, 'r') as file:
+            return json.load(file)
+    # model zoo names are plain folder names, a missing path is not looked up on the network
+    if model.endswith('.json') or os.sep in model or (os.altsep and os.altsep in model):
+        raise FileNotFoundError("No result.json at {}".format(model))
+
+    manifest = manifest or os.environ.get(MANIFEST_ENV)
+    if manifest:
+        config = _from_manifest(model, manifest)
+        if config is not None:
+            return config
+    if is_offline(offline):
+        raise OfflineError("{} is neither a local result.json nor in the manifest and the model zoo "
+                           "cannot be reached in offline mode".format(model))
+    response = requests.get(ZOO_URL.format(model), timeout = 60)
+    response.raise_for_status()
+    return response.json()
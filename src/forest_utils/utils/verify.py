@@ -0,0 +1,158 @@
+import os
+import json
+import mmap
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+
+BLOCK_SIZE = 64 * 1024 * 1024
+
+
+def hash_file(path):
+    """
+    Returns the hex SHA-256 digest of the file at 'path', read through a memory map
+
+    The map is hashed in large slices without copying it into Python objects, and hashlib releases
+    the GIL while hashing them, so several files are hashed in parallel by hash_files().
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(file.fileno(), 0, access = mmap.ACCESS_READ) as mapped:
+            view = memoryview(mapped)
+            try:
+                for start in range(0, len(view), BLOCK_SIZE):
+                    digest.update(view[start:start + BLOCK_SIZE])
+            finally:
+                view.release()
+    return digest.hexdigest()
+
+
+def hash_files(paths, jobs = 4):
+    """
+    Returns {path: hex SHA-256 digest} of several files hashed in parallel
+    """
+    paths = list(paths)
+    with ThreadPoolExecutor(max_workers = max(1, min(jobs, len(paths)))) as executor:
+        return dict(zip(paths, executor.map(hash_file, paths)))
+
+
+def file_entries(paths, jobs = 4):
+    """
+    Returns the 'Files' entries of result.json (name, size in bytes and SHA-256) for the given files
+    """
+    digests = hash_files(paths, jobs)
+    return [{'Name': os.path.basename(path), 'Size': os.path.getsize(path), 'SHA256': digests[path]} for path in digests]
+
+
+def expected(config, filename):
+    """
+    Returns the expected (size, sha256) of the artifact 'filename' of a result.json, None for unknown values
+
+    The artifact is looked up by name in 'Files' (or taken as the only entry there), the top-level
+    'SHA256' of older result.json files is used when there is no entry.
+    """
+    files = [entry for entry in config.get('Files', []) if isinstance(entry, dict)]
+    entry = next((entry for entry in files if entry.get('Name') == os.path.basename(filename)), None)
+    if entry is None and len(files) == 1:
+        entry = files[0]
+    entry = entry or {}
+    size = entry.get('Size')
+    sha256 = entry.get('SHA256')
+    # placeholders of the 'forest init' template are not values
+    if not sha256 or sha256.startswith('<'):
+        sha256 = config.get('SHA256')
+    return (size if isinstance(size, int) else None), (sha256 or None)
+
+
+def check(path, size = None, sha256 = None, digest = None):
+    """
+    Returns None if the file at 'path' matches the expected size and hash, otherwise the reason it does not
+
+    The size is compared first, so truncated files are detected without hashing them. 'digest' is
+    the already computed hash of the file, if any.
+    """
+    if not os.path.isfile(path):
+        return 'missing'
+    actual = os.path.getsize(path)
+    if size is not None and actual != size:
+        return 'size {} instead of {}'.format(actual, size)
+    if sha256 is not None and (digest or hash_file(path)) != sha256:
+        return 'SHA-256 mismatch'
+    return None
+
+
+def verify_files(paths, config, jobs = 4):
+    """
+    Verifies several files against the 'Files' entries of a result.json, hashing them in parallel
+
+    Returns
+    -------
+    results : dict
+        maps every path to None if it is intact, otherwise the reason it is not
+    """
+    checks = {path: expected(config, path) for path in paths}
+    hashed = [path for path, (size, sha256) in checks.items()
+              if sha256 is not None and os.path.isfile(path) and (size is None or os.path.getsize(path) == size)]
+    digests = hash_files(hashed, jobs) if hashed else {}
+    return {path: check(path, size, sha256, digests.get(path)) for path, (size, sha256) in checks.items()}
+
+
+def update_config(config_path, paths, jobs = 4):
+    """
+    Records the sizes and SHA-256 of 'paths' in the 'Files' entries of the result.json at 'config_path'
+    """
+    with open(config_path, 'r') as file:
+        config = json.load(file)
+    entries = {entry.get('Name'): entry for entry in config.get('Files', []) if isinstance(entry, dict)}
+    for entry in file_entries(paths, jobs):
+        entries[entry['Name']] = entry
+    config['Files'] = [entry for name, entry in entries.items() if name and not name.startswith('<')]
+    with open(config_path, 'w') as file:
+        json.dump(config, file, indent = 2)
+    return config
+
+
+class Stamp(object):
+    """
+    Remembers that a file was verified, so later checks only compare its size and modification time
+
+    The stamp is stored next to the file as '<file>.verified'. A file changed in any way that
+    alters its size or modification time (truncation, an interrupted copy, a rewrite) is hashed again.
+    """
+
+    def __init__(self, path):
+        super().__init__()
+
+        self.path = path
+        self.stamp = path + '.verified'
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+    def write(self, sha256 = None):
+        with open(self.stamp, 'w') as file:
+            json.dump(dict(self._signature(), sha256 = sha256), file)
+
+    def intact(self, size = None, sha256 = None):
+        """
+        Returns whether the file matches the expected size and hash, hashing it only if it changed since its stamp
+        """
+        if not os.path.isfile(self.path):
+            return False
+        if size is not None and os.path.getsize(self.path) != size:
+            return False
+        if sha256 is None:
+            return True
+        try:
+            with open(self.stamp, 'r') as file:
+                stamp = json.load(file)
+            if stamp.pop('sha256') == sha256 and stamp == self._signature():
+                return True
+        except (OSError, ValueError, KeyError):
+            pass
+        if hash_file(self.path) != sha256:
+            return False
+        self.write(sha256)
+        return True
@@ -0,0 +1,45 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import cache
+
+WORDS = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]', 'good', 'bad', 'movie', 'great', 'plot', 'the', 'was']
+
+
+def _tiny_bert(tmp_path, monkeypatch, model_class, loader_class):
+    """
+    Returns a loader of a tiny, randomly initialized BERT model built locally instead of downloaded
+    """
+    transformers = pytest.importorskip('transformers')
+    from forest_utils import export_transformers
+
+    path = tmp_path / 'model' / 'transformer'
+    path.mkdir(parents = True)
+    (path / 'vocab.txt').write_text('\n'.join(WORDS))
+    transformers.BertTokenizerFast(str(path / 'vocab.txt')).save_pretrained(str(path))
+    config = transformers.BertConfig(vocab_size = len(WORDS), hidden_size = 32, num_hidden_layers = 2,
+                                     num_attention_heads = 2, intermediate_size = 64,
+                                     id2label = {0: 'NEG', 1: 'POS'}, label2id = {'NEG': 0, 'POS': 1})
+    pytest.importorskip('torch').manual_seed(0)
+    getattr(transformers, model_class)(config).save_pretrained(str(path))
+    monkeypatch.setattr(cache, 'fetch_extracted', lambda *args, **kwargs: str(tmp_path / 'model'))
+    return getattr(export_transformers, loader_class)('transformer', config = {'Link': 'https://drive.google.com/file/d/abc/view'})
+
+
+@pytest.fixture
+def classifier(tmp_path, monkeypatch):
+    """
+    A ModelFromTransformerForClassification of a tiny BERT classifier
+    """
+    return _tiny_bert(tmp_path, monkeypatch, 'BertForSequenceClassification', 'ModelFromTransformerForClassification')
+
+
+@pytest.fixture
+def language_model(tmp_path, monkeypatch):
+    """
+    A ModelFromTransformerWithLMHead of a tiny BERT masked language model
+    """
+    return _tiny_bert(tmp_path, monkeypatch, 'BertForMaskedLM', 'ModelFromTransformerWithLMHead')
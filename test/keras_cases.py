@@ -0,0 +1,136 @@
+"""
+Keras tests, run in their own process by test_keras.py since TensorFlow crashes once torch is loaded in the same process
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import cache
+
+tf = pytest.importorskip('tensorflow')
+CONFIG = {'Link': 'https://drive.google.com/file/d/abc/view'}
+
+
+def _dense_model():
+    tf.random.set_seed(0)
+    model = tf.keras.Sequential([tf.keras.Input(shape = (4,)), tf.keras.layers.Dense(3)])
+    return model
+
+
+@pytest.fixture
+def h5(tmp_path, monkeypatch):
+    from forest_utils.export_keras import ModelFromH5
+
+    _dense_model().save(str(tmp_path / 'model.h5'))
+    monkeypatch.setattr(cache, 'fetch', lambda *args, **kwargs: str(tmp_path / 'model.h5'))
+    return ModelFromH5('model.h5', config = CONFIG)
+
+
+def test_predict_stream_matches_predict_without_retracing(h5):
+    inputs = np.random.RandomState(0).rand(10, 4).astype(np.float32)
+
+    batches = list(h5.predict_stream(iter(inputs), batch_size = 4))
+    assert [len(batch) for batch in batches] == [4, 4, 2]
+    np.testing.assert_allclose(np.concatenate(batches), h5.model.predict(inputs, verbose = 0), atol = 1e-5)
+    # the partial last batch and a second stream reuse the same traced function
+    list(h5.predict_stream(iter(inputs[:3]), batch_size = 4))
+    assert len(h5._predict_fns) == 1
+    assert next(iter(h5._predict_fns.values())).experimental_get_tracing_count() == 1
+
+
+def test_predict_stream_before_output_signature(h5, monkeypatch):
+    inputs = np.random.RandomState(0).rand(5, 4).astype(np.float32)
+    monkeypatch.setattr(tf, '__version__', '2.3.1')
+
+    batches = list(h5.predict_stream(iter(inputs), batch_size = 4))
+    np.testing.assert_allclose(np.concatenate(batches), h5.model.predict(inputs, verbose = 0), atol = 1e-5)
+
+
+@pytest.mark.parametrize('memoized', [False, True])
+def test_predict_of_no_inputs_is_empty(h5, memoized):
+    from forest_utils.utils.memo import ResultCache
+
+    if memoized:
+        h5.memoize(ResultCache())
+    assert h5.predict(np.empty((0, 4), dtype = np.float32)).shape == (0, 3)
+
+
+def test_memoized_predict_of_multi_input_and_output_models(tmp_path, monkeypatch):
+    from forest_utils.export_keras import ModelFromH5
+    from forest_utils.utils.memo import ResultCache
+
+    tf.random.set_seed(0)
+    left, right = tf.keras.Input(shape = (4,)), tf.keras.Input(shape = (2,))
+    joined = tf.keras.layers.Concatenate()([left, right])
+    model = tf.keras.Model([left, right], [tf.keras.layers.Dense(3)(joined), tf.keras.layers.Dense(2)(joined)])
+    model.save(str(tmp_path / 'model.h5'))
+    monkeypatch.setattr(cache, 'fetch', lambda *args, **kwargs: str(tmp_path / 'model.h5'))
+    loader = ModelFromH5('model.h5', config = CONFIG)
+    inputs = [np.random.RandomState(0).rand(3, 4).astype(np.float32), np.random.RandomState(1).rand(3, 2).astype(np.float32)]
+
+    expected = loader.predict(inputs)
+    loader.memoize(ResultCache())
+    loader.predict([inputs[0][:1], inputs[1][:1]])
+    outputs = loader.predict(inputs)
+    assert [output.shape for output in outputs] == [(3, 3), (3, 2)]
+    for output, value in zip(outputs, expected):
+        np.testing.assert_allclose(output, value, atol = 1e-5)
+    assert loader.result_cache.hits == 1 and [output.shape for output in loader.predict([inputs[0][:0], inputs[1][:0]])] == [(0, 3), (0, 2)]
+
+
+@pytest.fixture
+def checkpoints(tmp_path, monkeypatch):
+    """
+    Saves checkpoints 1 and 2 of a model trained with an optimizer and returns the weights of each step
+    """
+    model, optimizer = _dense_model(), tf.keras.optimizers.Adam()
+    model.compile(optimizer = optimizer, loss = 'mse')
+    manager = tf.train.CheckpointManager(tf.train.Checkpoint(transformer = model, optimizer = optimizer),
+                                         str(tmp_path / 'model' / 'checkpoints'), max_to_keep = 5)
+    weights = {}
+    for step in (1, 2):
+        model.fit(np.ones((4, 4)), np.full((4, 3), step), epochs = 1, verbose = 0)
+        manager.save(checkpoint_number = step)
+        weights[step] = [weight.copy() for weight in model.get_weights()]
+    monkeypatch.setattr(cache, 'fetch_extracted', lambda *args, **kwargs: str(tmp_path / 'model'))
+    return weights
+
+
+def _restore(**kwargs):
+    from forest_utils.export_keras import ModelFromCheckpoint
+
+    return ModelFromCheckpoint(_dense_model(), config = CONFIG, **kwargs).model
+
+
+def _assert_weights(model, expected):
+    for actual, weight in zip(model.get_weights(), expected):
+        np.testing.assert_allclose(actual, weight)
+
+
+def test_checkpoint_step_selection(checkpoints):
+    _assert_weights(_restore(), checkpoints[2])
+    _assert_weights(_restore(step = 1), checkpoints[1])
+    with pytest.raises(ValueError, match = 'available steps: 1, 2'):
+        _restore(step = 7)
+
+
+def test_inference_restore_skips_the_optimizer(checkpoints, monkeypatch):
+    partial = []
+    checkpoint = tf.train.Checkpoint
+
+    class Checkpoint(checkpoint):
+
+        def restore(self, path):
+            status = super().restore(path)
+            expect_partial = status.expect_partial
+            status.expect_partial = lambda: partial.append(path) or expect_partial()
+            return status
+
+    monkeypatch.setattr(tf.train, 'Checkpoint', Checkpoint)
+    _assert_weights(_restore(step = 1), checkpoints[1])
+    assert len(partial) == 1
+    _restore(step = 1, optimizer = tf.keras.optimizers.Adam())
+    assert len(partial) == 1
@@ -6,4 +6,4 @@ from forest_utils import export_keras
 
 model = export_keras.ModelFromH5()
 
-print(model.load_model())
\ No newline at end of file
+print(model.model)
\ No newline at end of file
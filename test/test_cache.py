@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import zipfile
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import cache
+from forest_utils.utils import extract
+from forest_utils.utils import verify
+
+
+def _writer(content):
+    calls = []
+
+    def download(path):
+        calls.append(path)
+        with open(path, 'wb') as file:
+            file.write(content)
+    return download, calls
+
+
+def test_fetch_downloads_once(tmp_path):
+    model_cache = cache.ModelCache(root = str(tmp_path))
+    download, calls = _writer(b'weights')
+
+    first = model_cache.fetch('abc', 'model.zip', download)
+    second = model_cache.fetch('abc', 'model.zip', download)
+
+    assert first == second
+    assert len(calls) == 1
+    assert open(first, 'rb').read() == b'weights'
+    assert not [name for name in os.listdir(os.path.dirname(first)) if name.endswith('.tmp')]
+
+
+def test_entries_are_keyed_by_file_id_and_checksum(tmp_path):
+    model_cache = cache.ModelCache(root = str(tmp_path))
+    download, _ = _writer(b'weights')
+    checksum = verify.hash_file(model_cache.fetch('abc', 'model.zip', download))
+
+    other = model_cache.fetch('xyz', 'model.zip', _writer(b'other')[0])
+    verified = model_cache.fetch('abc', 'model.zip', download, checksum = checksum)
+
+    assert open(other, 'rb').read() == b'other'
+    assert os.path.basename(os.path.dirname(verified)) == 'abc-' + checksum[:16]
+
+
+def test_checksum_mismatch_is_not_cached(tmp_path):
+    model_cache = cache.ModelCache(root = str(tmp_path))
+    download, _ = _writer(b'truncated')
+
+    with pytest.raises(IOError):
+        model_cache.fetch('abc', 'model.zip', download, checksum = '0' * 64)
+    assert not os.listdir(model_cache.entry_dir(model_cache.key('abc', '0' * 64)))
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    model_cache = cache.ModelCache(root = str(tmp_path), max_size = 10)
+
+    model_cache.fetch('old', 'model.zip', _writer(b'12345')[0])
+    time.sleep(0.01)
+    model_cache.fetch('new', 'model.zip', _writer(b'12345')[0])
+    time.sleep(0.01)
+    model_cache.fetch('old', 'model.zip', _writer(b'12345')[0])
+    model_cache.fetch('third', 'model.zip', _writer(b'12345')[0])
+
+    keys = [key for _, _, key in model_cache.entries()]
+    assert sorted(keys) == ['old', 'third']
+
+
+def _zip_writer(files):
+    def download(path):
+        with zipfile.ZipFile(path, 'w', zipfile.ZIP_DEFLATED) as zip_ref:
+            for name, content in files.items():
+                zip_ref.writestr(name, content)
+    return download
+
+
+def test_fetch_extracted_without_archive(tmp_path):
+    model_cache = cache.ModelCache(root = str(tmp_path))
+    download = _zip_writer({'model/config.json': b'{}', 'model/weights.bin': b'0' * 1024})
+
+    target = model_cache.fetch_extracted('abc', 'model.zip', download, keep_archive = False)
+
+    assert open(os.path.join(target, 'model', 'weights.bin'), 'rb').read() == b'0' * 1024
+    assert not os.path.exists(os.path.join(model_cache.entry_dir('abc'), 'model.zip'))
+    assert model_cache.fetch_extracted('abc', 'model.zip', _zip_writer({})) == target
+
+
+def test_extracted_directory_counts_towards_max_size(tmp_path):
+    model_cache = cache.ModelCache(root = str(tmp_path), max_size = 1000)
+
+    model_cache.fetch('old', 'model.h5', _writer(b'12345')[0])
+    # the compressed archive fits next to 'old', the extracted weights do not
+    model_cache.fetch_extracted('new', 'model.zip', _zip_writer({'model/weights.bin': b'0' * 4096}))
+
+    assert [key for _, _, key in model_cache.entries()] == ['new']
+
+
+def test_large_members_are_extracted_in_parallel(tmp_path):
+    archive = str(tmp_path / 'model.zip')
+    _zip_writer({'a/big.bin': b'1' * 4096, 'a/b/big.bin': b'2' * 4096, 'small.txt': b'3'})(archive)
+
+    target = extract.extract(archive, str(tmp_path / 'out'), jobs = 2, large_member = 1024)
+
+    assert open(os.path.join(target, 'a', 'b', 'big.bin'), 'rb').read() == b'2' * 4096
+    assert open(os.path.join(target, 'small.txt'), 'rb').read() == b'3'
+    assert not os.path.exists(target + '.tmp')
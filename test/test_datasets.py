@@ -0,0 +1,103 @@
+import os
+import sys
+import pickle
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils import datasets
+from forest_utils.utils import download
+
+pd = pytest.importorskip('pandas')
+pytest.importorskip('pyarrow')
+
+INDEX = {'emotion_tweets': {'link': 'https://drive.google.com/file/d/tweets/view'},
+         'reviews': {'link': 'https://drive.google.com/file/d/reviews/view'}}
+CSV = 'text,label,score\ni am happy,joy,0.9\ni am sad,sadness,0.8\nso angry,anger,0.7\nhappy again,joy,0.6\nfine,joy,0.5\n'
+
+
+@pytest.fixture
+def downloads(tmp_path, monkeypatch):
+    """
+    Serves the registry index and a small csv instead of downloading them, recording the downloaded urls
+    """
+    monkeypatch.chdir(tmp_path)
+    urls = []
+
+    def fake_download(url, path, **kwargs):
+        urls.append(url)
+        if url.endswith('tweets') or url.endswith('reviews'):
+            with open(path, 'w') as file:
+                file.write(CSV)
+        else:
+            with open(path, 'wb') as file:
+                pickle.dump(INDEX, file)
+
+    monkeypatch.setattr(download, 'download', fake_download)
+    return urls
+
+
+def test_usecols_dtype_categories_and_chunks(downloads):
+    tweets = datasets.Datasets().get_emo_tweets(usecols = ['text', 'label', 'score'], dtype = {'score': 'float32'},
+                                                categories = ['label'])
+
+    assert list(tweets.columns) == ['text', 'label', 'score'] and len(tweets) == 5
+    assert tweets['score'].dtype == 'float32' and isinstance(tweets['label'].dtype, pd.CategoricalDtype)
+    chunks = list(datasets.Datasets().get_emo_tweets(usecols = ['label'], chunksize = 2))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1] and list(chunks[0].columns) == ['label']
+    # the csv is only downloaded once, after the index
+    assert len(downloads) == 2
+
+
+@pytest.mark.parametrize('columnar', ['feather', 'parquet'])
+def test_columnar_cache_is_built_once_and_memory_mapped(downloads, monkeypatch, columnar):
+    built, mapped = [], []
+    to_columnar, read_table = datasets.Datasets._to_columnar, getattr(datasets, columnar).read_table
+    monkeypatch.setattr(datasets.Datasets, '_to_columnar', lambda self, *args: built.append(args) or to_columnar(self, *args))
+    monkeypatch.setattr(getattr(datasets, columnar), 'read_table',
+                        lambda *args, **kwargs: mapped.append(kwargs['memory_map']) or read_table(*args, **kwargs))
+
+    first = datasets.Datasets().get('reviews', categories = ['label'], columnar = columnar)
+    second = datasets.Datasets().get('reviews', usecols = ['text', 'label'], categories = ['label'], columnar = columnar)
+    chunks = list(datasets.Datasets().get('reviews', categories = ['label'], columnar = columnar, chunksize = 3))
+
+    assert len(built) == 1 and os.path.exists('reviews' + datasets.COLUMNAR_FORMATS[columnar])
+    assert mapped == [True, True, True]
+    assert first['text'].tolist() == pd.read_csv('reviews.csv')['text'].tolist()
+    assert list(second.columns) == ['text', 'label'] and isinstance(second['label'].dtype, pd.CategoricalDtype)
+    assert [len(chunk) for chunk in chunks] == [3, 2]
+
+
+def test_index_is_unpickled_once_and_reloaded_when_it_changes(downloads, monkeypatch):
+    loads = []
+    load = pickle.load
+    monkeypatch.setattr(datasets.pickle, 'load', lambda file: loads.append(file.name) or load(file))
+
+    assert datasets.Datasets().names() == ['emotion_tweets', 'reviews']
+    assert datasets.Datasets().get_index() is datasets.Datasets().get_index()
+    assert len(loads) == 1 and len(downloads) == 1
+
+    with open('datasets.pickle', 'wb') as file:
+        pickle.dump(dict(INDEX, news = INDEX['reviews']), file)
+    stat = os.stat('datasets.pickle')
+    os.utime('datasets.pickle', ns = (stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert datasets.Datasets().names() == ['emotion_tweets', 'news', 'reviews']
+    assert len(loads) == 2
+    assert datasets.Datasets().get('news')['label'].tolist() == ['joy', 'sadness', 'anger', 'joy', 'joy']
+
+
+def test_index_is_revalidated_against_the_etag(downloads, monkeypatch):
+    etags = iter(['"a"', '"a"', '"b"'])
+    monkeypatch.setattr(download, 'get_etag', lambda url: next(etags))
+
+    datasets.Datasets(index_ttl = 0).get_index()
+    assert len(downloads) == 1
+    datasets.Datasets(index_ttl = 0).get_index()
+    datasets.Datasets(index_ttl = 0).get_index()
+    assert len(downloads) == 1
+    # a new ETag downloads the index again
+    datasets.Datasets(index_ttl = 0).get_index()
+    assert len(downloads) == 2 and open('datasets.pickle.etag').read() == '"b"'
+    # within the ttl the server is not asked again
+    datasets.Datasets(index_ttl = 3600).get_index()
+    assert next(etags, None) is None and len(downloads) == 2
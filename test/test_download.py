@@ -0,0 +1,160 @@
+import os
+import sys
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import download
+
+CONTENT = os.urandom(300 * 1024 + 17)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    ranges = True
+    requests = []
+
+    def do_GET(self):
+        header = self.headers.get('Range')
+        self.requests.append(header)
+        if header and self.ranges:
+            start, end = header.split('=')[1].split('-')
+            start, end = int(start), min(int(end), len(CONTENT) - 1)
+            body = CONTENT[start:end + 1]
+            self.send_response(206)
+            self.send_header('Content-Range', 'bytes {}-{}/{}'.format(start, end, len(CONTENT)))
+        else:
+            body = CONTENT
+            self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    _Handler.ranges = True
+    _Handler.requests = []
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    thread = threading.Thread(target = httpd.serve_forever, daemon = True)
+    thread.start()
+    yield 'http://127.0.0.1:{}/model.zip'.format(httpd.server_address[1])
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_parallel_range_download(server, tmp_path):
+    output = str(tmp_path / 'model.zip')
+    updates = []
+
+    download.download(server, output, sha256 = hashlib.sha256(CONTENT).hexdigest(), jobs = 4,
+                      chunk_size = 64 * 1024, progress = lambda done, total: updates.append((done, total)))
+
+    assert open(output, 'rb').read() == CONTENT
+    assert updates[-1] == (len(CONTENT), len(CONTENT))
+    assert len(_Handler.requests) == 1 + 5
+    assert not os.path.exists(output + '.part')
+
+
+def test_resume_from_part_file(server, tmp_path):
+    output = str(tmp_path / 'model.zip')
+    chunk_size = 64 * 1024
+    with open(output + '.part', 'wb') as file:
+        file.write(CONTENT[:2 * chunk_size])
+    with open(output + '.part.json', 'w') as file:
+        file.write('{"size": %d, "chunk_size": %d, "done": [0, %d]}' % (len(CONTENT), chunk_size, chunk_size))
+
+    download.download(server, output, jobs = 2, chunk_size = chunk_size)
+
+    assert open(output, 'rb').read() == CONTENT
+    assert 'bytes=0-{}'.format(chunk_size - 1) not in _Handler.requests
+    assert not os.path.exists(output + '.part.json')
+
+
+def test_server_without_ranges(server, tmp_path):
+    _Handler.ranges = False
+    output = str(tmp_path / 'model.zip')
+
+    download.download(server, output, size = len(CONTENT))
+
+    assert open(output, 'rb').read() == CONTENT
+
+
+def test_hash_mismatch(server, tmp_path):
+    output = str(tmp_path / 'model.zip')
+
+    with pytest.raises(download.DownloadError):
+        download.download(server, output, sha256 = '0' * 64)
+    assert not os.path.exists(output)
+    assert not os.path.exists(output + '.part')
+
+
+DRIVE_URL = 'https://drive.google.com/uc?id=abc'
+FORM = ('<form id="download-form" action="https://drive.usercontent.google.com/download" method="get">'
+        '<input type="hidden" name="id" value="abc"><input type="hidden" name="export" value="download">'
+        '<input type="hidden" name="confirm" value="t"><input type="hidden" name="uuid" value="1-2"></form>')
+
+
+class _DriveResponse(object):
+
+    def __init__(self, url, body, content_type):
+        self.url = url
+        self.body = body
+        self.text = body.decode('utf-8', 'replace')
+        self.headers = {'Content-Type': content_type, 'Content-Length': str(len(body))}
+        self.cookies = {}
+        self.status_code = 200
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, size):
+        yield self.body
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+class _DriveSession(object):
+    """
+    Answers drive.google.com with 'page' and only serves the file from drive.usercontent.google.com
+    """
+
+    def __init__(self, page):
+        self.page = page
+        self.urls = []
+
+    def get(self, url, **kwargs):
+        self.urls.append(url)
+        if url.startswith('https://drive.usercontent.google.com/download?'):
+            return _DriveResponse(url, CONTENT, 'application/octet-stream')
+        return _DriveResponse(url, self.page.encode('utf-8'), 'text/html; charset=utf-8')
+
+
+def test_drive_download_form_is_confirmed(tmp_path):
+    session = _DriveSession(FORM)
+    output = str(tmp_path / 'model.zip')
+
+    download.download(DRIVE_URL, output, session = session)
+
+    assert open(output, 'rb').read() == CONTENT
+    assert session.urls[1] == 'https://drive.usercontent.google.com/download?id=abc&export=download&confirm=t&uuid=1-2'
+
+
+def test_unconfirmed_drive_page_is_not_saved(tmp_path):
+    output = str(tmp_path / 'model.zip')
+
+    with pytest.raises(download.DownloadError, match = 'web page'):
+        download.download(DRIVE_URL, output, session = _DriveSession('<html>Quota exceeded</html>'))
+    assert not os.path.exists(output) and not os.path.exists(output + '.part')
@@ -0,0 +1,35 @@
+import os
+import sys
+import subprocess
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src')
+MODULES = ['forest_utils', 'forest_utils.cli', 'forest_utils.datasets', 'forest_utils.export_keras',
+           'forest_utils.export_spacy', 'forest_utils.export_transformers', 'forest_utils.export_onnx']
+FRAMEWORKS = ['tensorflow', 'torch', 'transformers', 'spacy', 'pandas', 'numpy', 'requests', 'onnx', 'onnxruntime']
+# generous bound on the cumulative import time of all forest_utils modules, in microseconds
+IMPORT_BUDGET = 500000
+
+
+def _run(code):
+    env = dict(os.environ, PYTHONPATH = SRC)
+    return subprocess.run([sys.executable, '-X', 'importtime', '-c', code], env = env,
+                          stdout = subprocess.PIPE, stderr = subprocess.PIPE, universal_newlines = True, check = True)
+
+
+def test_frameworks_are_not_imported():
+    code = 'import sys\n' + ''.join('import {}\n'.format(module) for module in MODULES) + \
+           'print(" ".join(name for name in {!r} if name in sys.modules))'.format(FRAMEWORKS)
+
+    assert _run(code).stdout.split() == []
+
+
+def test_import_time_budget():
+    stderr = _run(''.join('import {}\n'.format(module) for module in MODULES)).stderr
+
+    cumulative = 0
+    for line in stderr.splitlines():
+        fields = line.split('|')
+        # only count top level forest_utils imports, nested ones are included in their cumulative time
+        if len(fields) == 3 and fields[2].startswith(' forest_utils'):
+            cumulative += int(fields[1])
+    assert 0 < cumulative < IMPORT_BUDGET
@@ -0,0 +1,16 @@
+import os
+import sys
+import subprocess
+import importlib.util
+
+import pytest
+
+CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'keras_cases.py')
+
+
+@pytest.mark.skipif(importlib.util.find_spec('tensorflow') is None, reason = 'tensorflow is not installed')
+def test_keras_cases():
+    # TensorFlow and torch crash when both are loaded into one process, so the Keras tests get their own
+    result = subprocess.run([sys.executable, '-m', 'pytest', '-q', '-p', 'no:cacheprovider', CASES],
+                            stdout = subprocess.PIPE, stderr = subprocess.STDOUT, universal_newlines = True)
+    assert result.returncode == 0, result.stdout[-5000:]
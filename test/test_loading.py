@@ -0,0 +1,95 @@
+import os
+import sys
+import time
+import asyncio
+import threading
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.loading import LazyLoader
+
+
+class _SlowModel(LazyLoader):
+
+    def __init__(self, lazy = False):
+        super().__init__()
+
+        self.calls = 0
+        self.release = threading.Event()
+        if not lazy:
+            self.release.set()
+        self._setup_loading(lazy)
+
+    def _load_model(self, force_download = False):
+        self.release.wait()
+        self.calls += 1
+        return 'model'
+
+
+def test_eager_load():
+    loader = _SlowModel()
+
+    assert loader.is_loaded
+    assert loader.model == 'model'
+
+
+def test_lazy_load_on_first_access():
+    loader = _SlowModel(lazy = True)
+    assert not loader.is_loaded
+
+    loader.release.set()
+    assert loader.model == 'model'
+    assert loader.model == 'model'
+    assert loader.calls == 1
+
+
+def test_future_loads_in_background():
+    loader = _SlowModel(lazy = True)
+
+    future = loader.load_future()
+    time.sleep(0.01)
+    assert not loader.is_loaded
+    assert loader.load_future() is future
+
+    loader.release.set()
+    assert future.result(timeout = 5) is loader
+    assert loader.is_loaded and loader.calls == 1
+
+
+def test_load_async_gathers_models():
+    loaders = [_SlowModel(lazy = True) for _ in range(3)]
+
+    async def main():
+        for loader in loaders:
+            asyncio.get_running_loop().call_later(0.01, loader.release.set)
+        return await asyncio.gather(*(loader.load_async() for loader in loaders))
+
+    assert asyncio.run(main()) == loaders
+    assert all(loader.model == 'model' for loader in loaders)
+
+
+class _FailingModel(LazyLoader):
+
+    def __init__(self):
+        super().__init__()
+
+        self.calls = 0
+        self._setup_loading(lazy = True)
+
+    def _load_model(self, force_download = False):
+        self.calls += 1
+        if self.calls == 1:
+            raise IOError('broken download')
+        return 'model'
+
+
+def test_failed_load_is_not_loaded():
+    loader = _FailingModel()
+
+    future = loader.load_future()
+    assert isinstance(future.exception(timeout = 5), IOError)
+    assert not loader.is_loaded
+
+    # the next attempt loads again
+    assert loader.load_future() is not future
+    assert loader.load_future().result(timeout = 5) is loader
+    assert loader.is_loaded and loader.model == 'model'
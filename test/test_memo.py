@@ -0,0 +1,73 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.loading import LazyLoader
+from forest_utils.utils.memo import ResultCache
+
+
+class _Counter(object):
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, inputs):
+        self.calls.append(list(inputs))
+        return [len(text) for text in inputs]
+
+
+def test_only_misses_reach_the_model():
+    result_cache = ResultCache()
+    compute = _Counter()
+
+    assert result_cache.map('model', ['good', 'bad movie'], compute) == [4, 9]
+    assert result_cache.map('model', ['bad   movie', 'fine', 'good', 'fine'], compute) == [9, 4, 4, 4]
+    assert result_cache.map('other model', ['good'], compute) == [4]
+
+    assert compute.calls == [['good', 'bad movie'], ['fine'], ['good']]
+    stats = result_cache.stats()
+    assert (stats['hits'], stats['misses']) == (2, 5)
+    assert stats['hit_rate'] == 2 / 7
+
+
+def test_results_of_the_wrong_length_are_not_cached():
+    result_cache = ResultCache()
+
+    with pytest.raises(ValueError, match = '1 results for 2 inputs'):
+        result_cache.map('model', ['good', 'bad'], lambda inputs: [[len(text) for text in inputs]])
+    assert result_cache.map('model', ['good'], lambda inputs: [len(text) for text in inputs]) == [4]
+
+
+def test_lru_and_disk_tier(tmp_path):
+    path = str(tmp_path / 'results.sqlite')
+    result_cache = ResultCache(max_size = 2, path = path)
+    result_cache.map('model', ['a', 'bb', 'ccc'], _Counter())
+    assert len(result_cache.memory) == 2
+    result_cache.close()
+
+    compute = _Counter()
+    reopened = ResultCache(max_size = 2, path = path)
+    assert reopened.map('model', ['a', 'ccc'], compute) == [1, 3]
+    assert compute.calls == [] and reopened.disk_hits == 2
+
+
+def test_loader_memoization_keys_arrays_and_model():
+    class Loader(LazyLoader):
+        file_id = 'abc'
+
+        def predict(self, inputs):
+            return np.stack(self._memoized('predict', list(inputs), compute))
+
+    compute = _Counter()
+    loader = Loader()
+    rows = np.arange(6, dtype = np.float32).reshape(3, 2)
+
+    assert loader.predict(rows).tolist() == [2, 2, 2]
+    assert len(compute.calls) == 1
+    loader.memoize()
+    loader.predict(rows)
+    loader.predict(rows[::-1])
+    assert len(compute.calls) == 2 and loader.result_cache.hits == 3
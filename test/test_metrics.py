@@ -0,0 +1,69 @@
+import os
+import sys
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import cache
+from forest_utils.utils import metrics
+
+
+@pytest.fixture
+def events():
+    collected = []
+    hook = metrics.add_hook(lambda name, value, labels: collected.append((name, value, labels)))
+    yield collected
+    metrics.remove_hook(hook)
+
+
+def _download(path):
+    with open(path, 'wb') as file:
+        file.write(b'weights')
+
+
+def test_cache_reports_phases_bytes_and_hits(tmp_path, events):
+    model_cache = cache.ModelCache(root = str(tmp_path))
+    model_cache.fetch('abc', 'model.zip', _download)
+    model_cache.fetch('abc', 'model.zip', _download)
+
+    phases = [labels['phase'] for name, _, labels in events if name == 'phase_seconds']
+    assert phases == ['download', 'verify']
+    assert ('download_bytes', 7, {'model': 'abc'}) in events
+    assert [name for name, _, _ in events if name.startswith('cache')] == ['cache_misses', 'cache_hits']
+
+
+def test_first_predict_is_timed_once(events):
+    class Loader(object):
+        @metrics.first_predict
+        def predict(self, x):
+            return x
+
+        @metrics.first_predict
+        def stream(self, items):
+            yield from items
+
+    loader = Loader()
+    assert loader.predict(1) == 1 and loader.predict(2) == 2
+    assert list(Loader().stream([1, 2])) == [1, 2]
+
+    timed = [labels for name, _, labels in events if name == 'phase_seconds']
+    assert timed == [{'phase': 'first_predict', 'loader': 'Loader'}] * 2
+
+
+def test_disabled_and_prometheus_export():
+    assert not metrics.enabled()
+    assert metrics.phase('download') is metrics.phase('extract')
+
+    exporter = metrics.add_hook(metrics.PrometheusExporter())
+    try:
+        with metrics.phase('download', model = 'abc'):
+            pass
+        metrics.emit('download_bytes', 7, model = 'abc')
+        metrics.emit('download_bytes', 3, model = 'abc')
+    finally:
+        metrics.remove_hook(exporter)
+
+    text = exporter.render()
+    assert '# TYPE forest_phase_seconds summary' in text
+    assert 'forest_phase_seconds_count{model="abc",phase="download"} 1' in text
+    assert 'forest_download_bytes_total{model="abc"} 10' in text
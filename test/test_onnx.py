@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils import export_onnx
+
+pytest.importorskip('onnxruntime')
+
+TEXTS = ['the movie was good', 'bad plot', 'great great movie was the plot', 'unknown words', 'good']
+
+
+def test_transformer_parity(classifier, tmp_path):
+    onnx_path = export_onnx.export(classifier, str(tmp_path / 'onnx'))
+    model = export_onnx.ModelFromOnnx(path = str(tmp_path / 'onnx'), num_threads = 1)
+
+    assert os.path.basename(onnx_path) == 'model.onnx' and model.task == 'classification'
+    labels, scores = classifier.predict_batch(TEXTS, batch_size = 2)
+    onnx_labels, onnx_scores = model.predict_batch(TEXTS, batch_size = 2)
+    assert onnx_labels.tolist() == labels.tolist()
+    np.testing.assert_allclose(onnx_scores, scores, atol = 1e-5)
+
+    batch = classifier.tokenizer(TEXTS, padding = True, return_tensors = 'pt')
+    expected = classifier.model(**batch)[0].detach().numpy()
+    np.testing.assert_allclose(model._run({key: value.numpy() for key, value in batch.items()}), expected, atol = 1e-5)
+    assert model.predict(TEXTS[0]) == labels[0]
+
+
+@pytest.mark.parametrize('memoized', [False, True])
+def test_predict_of_no_inputs_is_empty(tmp_path, memoized):
+    onnx = pytest.importorskip('onnx')
+    from onnx import TensorProto, helper
+    from forest_utils.utils.memo import ResultCache
+
+    graph = helper.make_graph([helper.make_node('MatMul', ['inputs', 'weights'], ['outputs'])], 'dense',
+                              [helper.make_tensor_value_info('inputs', TensorProto.FLOAT, ['batch', 4])],
+                              [helper.make_tensor_value_info('outputs', TensorProto.FLOAT, ['batch', 3])],
+                              [helper.make_tensor('weights', TensorProto.FLOAT, [4, 3], np.ones(12).tolist())])
+    onnx_path = str(tmp_path / 'model.onnx')
+    onnx.save(helper.make_model(graph, opset_imports = [helper.make_opsetid('', 14)], ir_version = 8), onnx_path)
+    export_onnx._set_metadata(onnx_path, task = 'keras')
+    model = export_onnx.ModelFromOnnx(path = onnx_path)
+    if memoized:
+        model.memoize(ResultCache())
+
+    assert model.predict(np.empty((0, 4), dtype = np.float32)).shape == (0, 3)
+    assert model.predict(np.ones((2, 4), dtype = np.float32)).tolist() == [[4, 4, 4], [4, 4, 4]]
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+import signal
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.loading import LazyLoader
+from forest_utils.pool import WorkerPool
+
+
+class _ArrayModel(LazyLoader):
+
+    def __init__(self):
+        super().__init__()
+
+        self.loads = 0
+        self._setup_loading(lazy = True)
+
+    def _load_model(self, force_download = False):
+        self.loads += 1
+        return np.arange(10)
+
+    def predict_batch(self, inputs):
+        inputs = np.asarray(inputs)
+        return self.model[inputs], np.full(len(inputs), os.getpid())
+
+    def exit(self, inputs):
+        os.kill(os.getpid(), signal.SIGKILL)
+
+    def process(self, texts):
+        for text in texts:
+            yield (text.upper(), self.loads)
+
+
+def test_results_come_back_in_order():
+    loader = _ArrayModel()
+    with WorkerPool(loader, workers = 2) as pool:
+        values, pids = pool.map('predict_batch', np.arange(10)[::-1], batch_size = 3)
+        texts = pool.map('process', ['a', 'b', 'c', 'd', 'e'], batch_size = 2)
+
+    assert values.tolist() == list(range(10))[::-1]
+    assert os.getpid() not in set(pids.tolist())
+    # loaded once in the parent, the workers use the inherited model
+    assert texts == [(text, 1) for text in 'ABCDE'] and loader.loads == 1
+
+
+def test_dead_worker_is_replaced_with_the_model():
+    pool = WorkerPool(_ArrayModel(), workers = 1)
+    try:
+        _, pids = pool.map('predict_batch', [1])
+        # the worker dies in the middle of a task, whose result never comes back
+        pool.map_batches('exit', [[1]])
+        deadline = time.time() + 10
+        while time.time() < deadline and [worker.pid for worker in pool.pool._pool] == [pids[0]]:
+            time.sleep(0.05)
+        values, new_pids = pool.map('predict_batch', [1, 2])
+    finally:
+        # close() would wait for the lost task forever
+        pool.terminate()
+
+    assert values.tolist() == [1, 2] and new_pids[0] != pids[0]
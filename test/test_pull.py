@@ -0,0 +1,107 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+
+import pytest
+from click.testing import CliRunner
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils import cli
+from forest_utils.utils import cache
+from forest_utils.utils import pull
+from forest_utils.utils.download import DownloadError
+
+CONTENTS = {'a': b'weights of a', 'b': b'weights of model b', 'c': b'c', 'broken': b''}
+
+
+class _Downloads(object):
+    """
+    Stands in for cache.download, serving CONTENTS by Drive id and recording how many run at once
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.active = self.most_active = 0
+        self.lock = threading.Lock()
+
+    def __call__(self, url, path, progress = None):
+        file_id = url.split('=')[-1]
+        with self.lock:
+            self.calls.append(file_id)
+            self.active += 1
+            self.most_active = max(self.most_active, self.active)
+        try:
+            time.sleep(0.1)
+            if file_id == 'broken':
+                raise DownloadError("Error while downloading {}".format(url))
+            with open(path, 'wb') as file:
+                file.write(CONTENTS[file_id])
+            if progress is not None:
+                progress(len(CONTENTS[file_id]), len(CONTENTS[file_id]))
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+@pytest.fixture
+def zoo(tmp_path, monkeypatch):
+    """
+    Model zoo folders 'a', 'b', 'c' and 'broken' in the working directory and an empty model cache
+    """
+    for name, content in CONTENTS.items():
+        config = {'Link': 'https://drive.google.com/file/d/{}/view'.format(name), 'Model Format': 'zip'}
+        if name == 'a':
+            config['Files'] = [{'Name': 'model.zip', 'Size': len(content), 'SHA256': hashlib.sha256(content).hexdigest()}]
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'result.json').write_text(json.dumps(config))
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path / 'cache'))
+    downloads = _Downloads()
+    monkeypatch.setattr(cache, 'download', downloads)
+    return downloads
+
+
+def test_pull_downloads_concurrently_and_skips_cached_models(zoo):
+    reports = []
+    results, throughput = pull.pull_models(['a', 'b', 'c'], jobs = 2, report = lambda *args: reports.append(args))
+
+    assert results == {'a': 'downloaded', 'b': 'downloaded', 'c': 'downloaded'}
+    assert sorted(zoo.calls) == ['a', 'b', 'c'] and zoo.most_active == 2
+    assert throughput.total == sum(len(CONTENTS[name]) for name in 'abc') and reports
+
+    results, throughput = pull.pull_models(['a', 'b', 'c'], jobs = 2)
+    assert set(results.values()) == {'cached'} and len(zoo.calls) == 3 and throughput.total == 0
+
+    results, _ = pull.pull_models(['b'], force_download = True)
+    assert results == {'b': 'downloaded'} and len(zoo.calls) == 4
+
+
+def test_pull_downloads_a_corrupted_artifact_again(zoo):
+    pull.pull_models(['a'])
+    path = cache.ModelCache().fetch('a', 'model.zip', None, checksum = hashlib.sha256(CONTENTS['a']).hexdigest())
+    with open(path, 'wb') as file:
+        file.write(b'weights of x')
+
+    results, _ = pull.pull_models(['a'])
+    assert results == {'a': 'downloaded'} and zoo.calls == ['a', 'a']
+    assert open(path, 'rb').read() == CONTENTS['a']
+
+
+def test_pull_collects_errors_per_model(zoo):
+    results, _ = pull.pull_models(['broken', 'a', 'missing/result.json'])
+
+    assert results['a'] == 'downloaded'
+    assert isinstance(results['broken'], DownloadError) and isinstance(results['missing/result.json'], FileNotFoundError)
+
+
+def test_pull_command(zoo):
+    result = CliRunner().invoke(cli.main, ['pull', 'a', 'b', '--jobs', '2'])
+    assert result.exit_code == 0
+    assert '[INFO]:a: downloaded' in result.output and '[INFO]:b: downloaded' in result.output
+
+    result = CliRunner().invoke(cli.main, ['pull', 'a', 'broken'])
+    assert result.exit_code == 1
+    assert '[INFO]:a: cached' in result.output and '[ERROR]:broken:' in result.output
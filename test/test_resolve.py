@@ -0,0 +1,71 @@
+import os
+import sys
+import json
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import cache
+from forest_utils.utils import resolve
+
+CONFIG = {'Link': 'https://drive.google.com/file/d/abc/view'}
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok = True)
+    with open(path, 'w') as file:
+        json.dump(content, file)
+    return path
+
+
+def test_local_paths(tmp_path):
+    path = _write(str(tmp_path / 'model' / 'result.json'), CONFIG)
+
+    assert resolve.resolve_config(path) == CONFIG
+    assert resolve.resolve_config(os.path.dirname(path)) == CONFIG
+    assert resolve.resolve_config(CONFIG) is CONFIG
+
+
+def test_manifest_lookup_by_name(tmp_path, monkeypatch):
+    zoo = str(tmp_path / 'zoo')
+    _write(os.path.join(zoo, 'CORD-Spacy', 'result.json'), CONFIG)
+    manifest = _write(str(tmp_path / 'manifest.json'), {'Tweets-BERT': CONFIG})
+
+    assert resolve.resolve_config('CORD-Spacy', manifest = zoo, offline = True) == CONFIG
+    monkeypatch.setenv(resolve.MANIFEST_ENV, manifest)
+    assert resolve.resolve_config('Tweets-BERT', offline = True) == CONFIG
+
+
+def test_offline_fails_fast(tmp_path, monkeypatch):
+    monkeypatch.setenv(resolve.OFFLINE_ENV, '1')
+    with pytest.raises(resolve.OfflineError):
+        resolve.resolve_config('Unknown-Model')
+
+    model_cache = cache.ModelCache(root = str(tmp_path))
+    with pytest.raises(resolve.OfflineError):
+        model_cache.fetch('abc', 'model.zip', lambda path: pytest.fail('downloaded in offline mode'))
+
+    online = cache.ModelCache(root = str(tmp_path), offline = False)
+    online.fetch('abc', 'model.zip', lambda path: open(path, 'wb').write(b'weights'))
+    assert model_cache.fetch('abc', 'model.zip', lambda path: pytest.fail('downloaded in offline mode'))
+
+
+def test_missing_paths_are_not_looked_up_by_name(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(resolve, 'requests', None)
+
+    for path in ('result.json', str(tmp_path / 'missing' / 'result.json'), os.path.join('missing', 'model')):
+        with pytest.raises(FileNotFoundError):
+            resolve.resolve_config(path, offline = False)
+
+
+def test_loaders_raise_offline_errors(tmp_path, monkeypatch):
+    from forest_utils.export_spacy import ModelFromSpacy
+
+    monkeypatch.setenv(cache.CACHE_DIR_ENV, str(tmp_path))
+    with pytest.raises(resolve.OfflineError):
+        ModelFromSpacy('model', config = CONFIG, offline = True)
+    loader = ModelFromSpacy('model', config = CONFIG, offline = True, lazy = True)
+    with pytest.raises(resolve.OfflineError):
+        loader.load_future().result(timeout = 5)
+    assert not loader.is_loaded
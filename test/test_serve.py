@@ -0,0 +1,83 @@
+import os
+import sys
+import json
+import asyncio
+import threading
+import http.client
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.serve import ModelServer
+
+
+def _start(predict, **kwargs):
+    loop = asyncio.new_event_loop()
+    server = ModelServer(predict, port = 0, **kwargs)
+    port = loop.run_until_complete(server.start())
+    thread = threading.Thread(target = loop.run_forever, daemon = True)
+    thread.start()
+    return server, port, loop
+
+
+def _request(port, method, path, payload = None):
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout = 10)
+    body = json.dumps(payload) if payload is not None else None
+    connection.request(method, path, body = body, headers = {'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    result = response.status, json.loads(response.read())
+    connection.close()
+    return result
+
+
+def test_concurrent_requests_are_batched_in_order():
+    calls = []
+
+    def predict(inputs):
+        calls.append(list(inputs))
+        return [text.upper() for text in inputs]
+
+    server, port, loop = _start(predict, max_batch_size = 8, max_latency = 0.2)
+    texts = ['text {}'.format(index) for index in range(8)]
+    with ThreadPoolExecutor(max_workers = 8) as executor:
+        responses = list(executor.map(lambda text: _request(port, 'POST', '/predict', {'input': text}), texts))
+
+    assert responses == [(200, {'output': text.upper()}) for text in texts]
+    assert max(server.batcher.batch_sizes) > 1
+    assert sum(map(len, calls)) == 8
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout = 5)
+
+
+def test_inputs_health_and_errors():
+    def predict(inputs):
+        if 'boom' in inputs:
+            raise ValueError('boom')
+        return [len(text) for text in inputs]
+
+    server, port, loop = _start(predict, max_latency = 0.001, is_ready = lambda: False)
+
+    assert _request(port, 'GET', '/health') == (200, {'status': 'ok', 'ready': False})
+    assert _request(port, 'POST', '/predict', {'inputs': ['a', 'abc']}) == (200, {'outputs': [1, 3]})
+    assert _request(port, 'POST', '/predict', {'text': 'a'})[0] == 400
+    assert _request(port, 'POST', '/predict', {'inputs': 'abc'}) == (400, {'error': '"inputs" must be a list'})
+    assert _request(port, 'POST', '/predict', {'input': 'boom'}) == (500, {'error': 'boom'})
+    assert _request(port, 'GET', '/missing')[0] == 404
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout = 5)
+
+
+def test_a_bad_input_only_fails_its_own_request():
+    calls = []
+
+    def predict(inputs):
+        calls.append(list(inputs))
+        return [text.upper() for text in inputs]
+
+    server, port, loop = _start(predict, max_batch_size = 4, max_latency = 0.2)
+    payloads = [{'input': 'a'}, {'input': 1}, {'input': 'b'}, {'input': 'c'}]
+    with ThreadPoolExecutor(max_workers = 4) as executor:
+        responses = list(executor.map(lambda payload: _request(port, 'POST', '/predict', payload), payloads))
+
+    assert [status for status, _ in responses] == [200, 500, 200, 200]
+    assert [body.get('output') for _, body in responses] == ['A', None, 'B', 'C']
+    # the failed batch was predicted again one input at a time
+    assert max(map(len, calls)) > 1
+    asyncio.run_coroutine_threadsafe(server.stop(), loop).result(timeout = 5)
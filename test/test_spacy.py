@@ -0,0 +1,68 @@
+import os
+import sys
+import inspect
+
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import cache
+
+spacy = pytest.importorskip('spacy')
+CONFIG = {'Link': 'https://drive.google.com/file/d/abc/view'}
+
+
+def _loader(tmp_path, monkeypatch, **kwargs):
+    """
+    Returns a ModelFromSpacy of a blank English pipeline with a sentencizer and an entity ruler, saved locally
+    """
+    from forest_utils.export_spacy import ModelFromSpacy
+
+    path = tmp_path / 'model' / 'pipeline'
+    if not path.exists():
+        nlp = spacy.blank('en')
+        nlp.add_pipe('sentencizer')
+        nlp.add_pipe('entity_ruler').add_patterns([{'label': 'ORG', 'pattern': 'SmokeTrees'}])
+        path.parent.mkdir(parents = True)
+        nlp.to_disk(str(path))
+    monkeypatch.setattr(cache, 'fetch_extracted', lambda *args, **kwargs: str(tmp_path / 'model'))
+    return ModelFromSpacy('pipeline', config = CONFIG, **kwargs)
+
+
+def test_process_streams_docs_and_disables_components_per_call(tmp_path, monkeypatch):
+    loader = _loader(tmp_path, monkeypatch)
+    texts = ('SmokeTrees made this. It works. Case {}.'.format(i) for i in range(5))
+
+    docs = loader.process(texts, batch_size = 2)
+    assert inspect.isgenerator(docs)
+    docs = list(docs)
+    assert [len(list(doc.sents)) for doc in docs] == [3] * 5 and all(doc.ents[0].label_ == 'ORG' for doc in docs)
+
+    partial = loader.process(['SmokeTrees made this. It works.'], disable = ['entity_ruler'])
+    assert next(partial).ents == ()
+    # other callers still get the full pipeline while the generator is paused
+    assert next(loader.process(['SmokeTrees made this.'])).ents[0].text == 'SmokeTrees'
+    list(partial)
+    assert loader.model.pipe_names == ['sentencizer', 'entity_ruler']
+
+
+def test_components_disabled_at_load_time(tmp_path, monkeypatch):
+    loader = _loader(tmp_path, monkeypatch, disable = ['entity_ruler'])
+
+    doc = next(loader.process(['SmokeTrees made this. It works.']))
+    assert loader.model.pipe_names == ['sentencizer'] and 'entity_ruler' in loader.model.disabled
+    assert doc.ents == () and len(list(doc.sents)) == 2
+
+
+def test_snapshot_leaves_out_excluded_components(tmp_path, monkeypatch):
+    from forest_utils import export_spacy
+
+    _loader(tmp_path, monkeypatch, snapshot = True, exclude = ['entity_ruler']).model
+    snapshot = tmp_path / 'model' / 'pipeline.snapshot-entity_ruler'
+    assert spacy.load(str(snapshot)).pipe_names == ['sentencizer']
+    written = (snapshot / 'config.cfg').stat().st_mtime_ns
+
+    # the next load only reads the snapshot
+    monkeypatch.setattr(export_spacy.ModelFromSpacy, '_load_pipeline', lambda self, path: pytest.fail('loaded the full pipeline'))
+    loader = _loader(tmp_path, monkeypatch, snapshot = True, exclude = ['entity_ruler'])
+    assert loader.model.pipe_names == ['sentencizer'] and (snapshot / 'config.cfg').stat().st_mtime_ns == written
+    assert not (tmp_path / 'model' / 'pipeline.snapshot').exists()
@@ -0,0 +1,135 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.export_transformers import _sliding_windows
+
+torch = pytest.importorskip('torch')
+
+DOCUMENTS = ['good movie', ' '.join(['the plot was bad', 'great movie'] * 7), 'bad', ' '.join(['good plot'] * 11)]
+
+
+def test_predict_batch_restores_the_order_of_the_texts(classifier):
+    texts = ['the plot was bad and the movie was bad', 'good', 'great movie', 'the movie was good']
+    labels, scores = classifier.predict_batch(texts, batch_size = 2)
+
+    assert labels.dtype == object and scores.dtype == np.float32
+    for text, label, score in zip(texts, labels, scores):
+        with torch.no_grad():
+            probs = torch.softmax(classifier.model(**classifier.tokenizer(text, return_tensors = 'pt'))[0][0], dim = -1)
+        assert label == classifier.model.config.id2label[int(probs.argmax())]
+        assert abs(score - float(probs.max())) < 1e-5
+    # sentences are truncated to max_length tokens
+    long = ' '.join(['good', 'bad'] * 25)
+    _, (score,) = classifier.predict_batch([long], max_length = 8)
+    with torch.no_grad():
+        logits = classifier.model(**classifier.tokenizer(long, truncation = True, max_length = 8, return_tensors = 'pt'))[0][0]
+    assert abs(score - float(torch.softmax(logits, dim = -1).max())) < 1e-5
+
+
+def test_pipelines_are_built_once_per_task_on_the_model_device(classifier):
+    pipeline = classifier._get_pipeline('sentiment-analysis')
+
+    assert classifier.predict('good movie') == classifier.predict_batch(['good movie'])[0][0]
+    assert classifier.predict('bad plot') == classifier.predict_batch(['bad plot'])[0][0]
+    assert classifier._get_pipeline('sentiment-analysis') is pipeline and list(classifier._pipelines) == ['sentiment-analysis']
+    assert pipeline.model is classifier.model
+    assert all(parameter.device.type == classifier.device for parameter in classifier.model.parameters())
+
+
+def test_language_model_batches_restore_the_order_of_the_texts(language_model):
+    texts = ['the plot was bad and the movie was bad', 'good', 'great movie', 'the movie was good']
+    logits = language_model.predict_batch(texts, batch_size = 3)
+
+    assert type(language_model.model).__name__ == 'BertForMaskedLM'
+    for text, row in zip(texts, logits):
+        with torch.no_grad():
+            expected = language_model.model(**language_model.tokenizer(text, return_tensors = 'pt'))[0][0].numpy()
+        assert row.shape == expected.shape
+        np.testing.assert_allclose(row, expected, atol = 1e-4)
+
+
+@pytest.mark.parametrize('pooling', ['mean', 'cls'])
+def test_embed_pools_the_last_hidden_state(language_model, pooling):
+    texts = ['the plot was bad and the movie was bad', 'good', 'great movie']
+    embeddings = language_model.embed(texts, batch_size = 2, pooling = pooling)
+
+    assert embeddings.dtype == np.float32 and embeddings.flags['C_CONTIGUOUS']
+    assert embeddings.shape == (3, language_model.model.config.hidden_size)
+    for text, row in zip(texts, embeddings):
+        with torch.no_grad():
+            hidden = language_model.model(**language_model.tokenizer(text, return_tensors = 'pt'), output_hidden_states = True)[-1][-1][0]
+        np.testing.assert_allclose(row, hidden.mean(dim = 0).numpy() if pooling == 'mean' else hidden[0].numpy(), atol = 1e-5)
+    with pytest.raises(ValueError):
+        language_model.embed(texts, pooling = 'max')
+
+
+def test_quantized_model_is_cached_and_close_to_fp32(classifier, monkeypatch):
+    config = {'Link': 'https://drive.google.com/file/d/abc/view'}
+    quantized = type(classifier)('transformer', cpu_optimize = True, config = config)
+    texts = ['good movie', 'the plot was bad and the movie was bad', 'great', 'the plot was good']
+
+    assert os.path.exists(quantized.model_path + '.quantized.pt')
+    delta = quantized.quantization_delta(texts * 3)
+    assert delta['max_abs_diff'] < 0.01 and delta['top1_agreement'] >= 0.9
+
+    # the next load builds the quantized model from the cached weights instead of quantizing again
+    monkeypatch.setattr(torch.quantization, 'quantize_dynamic', lambda *args, **kwargs: pytest.fail('quantized again'))
+    reloaded = type(classifier)('transformer', cpu_optimize = True, config = config)
+    assert any(type(module).__name__ == 'Linear' and 'quantized' in type(module).__module__ for module in reloaded.model.modules())
+    for expected, actual in zip(quantized.predict_batch(texts), reloaded.predict_batch(texts)):
+        assert expected.tolist() == actual.tolist()
+
+
+def test_snapshot_is_written_once_and_loaded_next_time(classifier):
+    config = {'Link': 'https://drive.google.com/file/d/abc/view'}
+    path = classifier.model_path
+    # a model without safetensors weights, like most zoo models
+    torch.save(classifier.model.state_dict(), os.path.join(path, 'pytorch_model.bin'))
+    os.remove(os.path.join(path, 'model.safetensors'))
+
+    first = type(classifier)('transformer', snapshot = True, config = config)
+    snapshot = path + '.snapshot'
+    weights = os.path.join(snapshot, 'model.safetensors')
+    assert first.model_path == path and os.path.exists(weights)
+    written = os.stat(weights).st_mtime_ns
+
+    second = type(classifier)('transformer', snapshot = True, config = config)
+    assert second.model_path == snapshot and os.stat(weights).st_mtime_ns == written
+    assert second.predict_batch(['good movie'])[1].tolist() == first.predict_batch(['good movie'])[1].tolist()
+
+
+def test_windows_overlap_and_cover_every_token(classifier):
+    tokenizer = classifier.tokenizer
+    windows, owners = _sliding_windows(tokenizer, DOCUMENTS, window = 8, stride = 2)
+
+    for i, text in enumerate(DOCUMENTS):
+        ids = tokenizer(text, add_special_tokens = False)['input_ids']
+        chunks = [window[1:-1] for window, owner in zip(windows, owners) if owner == i]
+        assert all(len(chunk) <= 6 for chunk in chunks)
+        assert all(previous[-2:] == chunk[:2] for previous, chunk in zip(chunks, chunks[1:]))
+        assert chunks[0] + [token for chunk in chunks[1:] for token in chunk[2:]] == ids
+    with pytest.raises(ValueError):
+        _sliding_windows(tokenizer, DOCUMENTS, window = 8, stride = 6)
+
+
+def test_window_logits_are_averaged_per_document(classifier):
+    labels, scores = classifier.predict_long(DOCUMENTS, window = 8, stride = 2, batch_size = 3)
+
+    windows, owners = _sliding_windows(classifier.tokenizer, DOCUMENTS, window = 8, stride = 2)
+    for i in range(len(DOCUMENTS)):
+        own = [window for window, owner in zip(windows, owners) if owner == i]
+        with torch.no_grad():
+            logits = [classifier.model(torch.tensor([window]))[0][0].numpy() * len(window) for window in own]
+        probs = torch.softmax(torch.tensor(sum(logits) / sum(len(window) for window in own)), dim = -1)
+        assert labels[i] == classifier.model.config.id2label[int(probs.argmax())]
+        assert abs(scores[i] - float(probs.max())) < 1e-5
+
+    # documents fitting into one window are classified like predict_batch does
+    short_labels, short_scores = classifier.predict_long(DOCUMENTS[:1] + DOCUMENTS[2:3])
+    expected_labels, expected_scores = classifier.predict_batch(DOCUMENTS[:1] + DOCUMENTS[2:3])
+    assert short_labels.tolist() == expected_labels.tolist()
+    np.testing.assert_allclose(short_scores, expected_scores, atol = 1e-5)
@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import hashlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src'))
+from forest_utils.utils import cache
+from forest_utils.utils import verify
+
+CONTENT = os.urandom(100 * 1024 + 3)
+
+
+def _artifact(tmp_path, name = 'model.zip', content = CONTENT):
+    path = str(tmp_path / name)
+    with open(path, 'wb') as file:
+        file.write(content)
+    return path
+
+
+def test_update_config_and_verify(tmp_path):
+    path = _artifact(tmp_path)
+    config_path = str(tmp_path / 'result.json')
+    with open(config_path, 'w') as file:
+        json.dump({'Link': 'x', 'Files': [{'Name': '<file name>', 'Size': '<size>', 'SHA256': '<sha>'}]}, file)
+
+    config = verify.update_config(config_path, [path])
+    assert config['Files'] == [{'Name': 'model.zip', 'Size': len(CONTENT), 'SHA256': hashlib.sha256(CONTENT).hexdigest()}]
+    assert verify.verify_files([path], config) == {path: None}
+
+    with open(path, 'r+b') as file:
+        file.truncate(1000)
+    missing = str(tmp_path / 'other.zip')
+    results = verify.verify_files([path, missing], config)
+    assert results[path].startswith('size 1000') and results[missing] == 'missing'
+
+
+def test_cache_hashes_once_and_replaces_corrupted_artifacts(tmp_path, monkeypatch):
+    source = _artifact(tmp_path, 'source.zip')
+    checksum = hashlib.sha256(CONTENT).hexdigest()
+    model_cache = cache.ModelCache(root = str(tmp_path / 'cache'))
+    downloads = []
+
+    def download(path):
+        downloads.append(path)
+        with open(path, 'wb') as file:
+            file.write(CONTENT)
+
+    path = model_cache.fetch('abc', 'model.zip', download, checksum = checksum, size = len(CONTENT))
+    hashed = []
+    monkeypatch.setattr(verify, 'hash_file', lambda path: hashed.append(path) or verify.hashlib.sha256(open(path, 'rb').read()).hexdigest())
+    model_cache.fetch('abc', 'model.zip', download, checksum = checksum, size = len(CONTENT))
+    assert hashed == [] and len(downloads) == 1
+
+    with open(path, 'r+b') as file:
+        file.write(b'corrupted')
+    model_cache.fetch('abc', 'model.zip', download, checksum = checksum, size = len(CONTENT))
+    assert len(downloads) == 2
+    assert open(path, 'rb').read() == open(source, 'rb').read()